@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Measure MamaTY performance on synthetic game data"""
+
+import argparse
+import functools
+import json
+import logging
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, TypeVar
+
+from mamaty import Graph, Object, SubGraph, load_databank
+from mamaty.forward import ForwardReachability
+from mamaty.databank import read_transition_columns
+from mamaty.profiling import Profiler
+from mamaty.synthetic import generate_databank
+
+_T = TypeVar('_T')
+
+
+def timed(timings: Dict[str, float], name: str,
+          function: Callable[[], _T]) -> _T:
+    """Call function, recording its wall time in seconds"""
+    start = time.perf_counter()
+    result = function()
+    timings[name] = time.perf_counter() - start
+    return result
+
+
+def measure(args: argparse.Namespace, object_count: int) -> Dict[str, Any]:
+    """Benchmark one scale of game data"""
+    timings = {}  # type: Dict[str, float]
+    with tempfile.TemporaryDirectory() as folder:
+        generate = functools.partial(
+            generate_databank, folder, object_count, args.fan_out, args.fan_in,
+            args.cycle_density, object_count // 50, args.seed)
+        timed(timings, 'generate', generate)
+        timed(timings, 'parse_objects',
+              lambda: Object.parse_all(folder + '/objects'))
+        timed(timings, 'read_transition_columns',
+              lambda: read_transition_columns(folder + '/transitions'))
+        objects, transitions = timed(timings, 'load_databank',
+                                     lambda: load_databank(folder))
+    profiler = Profiler()
+    graph = timed(timings, 'graph',
+                  lambda: Graph(objects, transitions, profiler))
+    for phase in profiler.phases:
+        timings['graph_' + phase.name] = phase.seconds
+
+    rnd = random.Random(args.seed)
+    queried = rnd.sample(
+        sorted(graph.obj_to_node), min(args.queries, len(graph.obj_to_node)))
+    query_times = []  # type: List[float]
+    graphviz_times = []  # type: List[float]
+    for obj in queried:
+        subgraph = SubGraph(graph)
+        start = time.perf_counter()
+        subgraph.leading_to_obj(obj)
+        query_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        subgraph.to_graphviz()
+        graphviz_times.append(time.perf_counter() - start)
+
+    forward = timed(timings, 'forward_baseline',
+                    lambda: ForwardReachability(graph))
+    forward_times = []  # type: List[float]
+    for _ in queried:
+        inventory = rnd.sample(queried, min(10, len(queried)))
+        start = time.perf_counter()
+        forward.from_inventory(inventory)
+        forward_times.append(time.perf_counter() - start)
+    for name, values in (('leading_to_obj', query_times),
+                         ('to_graphviz', graphviz_times), ('from_inventory',
+                                                           forward_times)):
+        timings[name + '_mean'] = sum(values) / max(1, len(values))
+        timings[name + '_max'] = max(values, default=0.)
+
+    return {
+        'objects': object_count,
+        'transitions': len(transitions),
+        'nodes': graph.node_count(),
+        'edges': graph.edge_count(),
+        'timings': timings,
+    }
+
+
+def compare(results: Dict[str, Any], reference_file: str) -> None:
+    """Print timings relative to a previous run"""
+    with open(reference_file, 'r') as in_file:
+        reference = json.load(in_file)
+    previous = {scale['objects']: scale for scale in reference['scales']}
+    for scale in results['scales']:
+        old = previous.get(scale['objects'])
+        if old is None:
+            continue
+        for name, value in sorted(scale['timings'].items()):
+            if old['timings'].get(name):
+                print(
+                    "{:>7} {:<24} {:9.4f}s {:+7.1%}".format(
+                        scale['objects'], name, value,
+                        value / old['timings'][name] - 1),
+                    file=sys.stderr)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--scales',
+        type=int,
+        nargs='+',
+        default=[500, 2000, 5000],
+        help="numbers of objects to generate")
+    parser.add_argument(
+        '--fan-out',
+        type=float,
+        default=3.,
+        help="average number of transitions using an object")
+    parser.add_argument(
+        '--fan-in',
+        type=float,
+        default=2.,
+        help="average number of transitions making an object")
+    parser.add_argument(
+        '--cycle-density',
+        type=float,
+        default=0.05,
+        help="share of transition outputs making cycles")
+    parser.add_argument(
+        '--queries',
+        type=int,
+        default=50,
+        help="number of objects whose graph is computed")
+    parser.add_argument('--seed', type=int, default=0, help="random seed")
+    parser.add_argument(
+        '--output', metavar='FILE', help="where to write results as JSON")
+    parser.add_argument(
+        '--compare',
+        metavar='FILE',
+        help="previous results to compare timings with")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    ARGS = parse_args()
+    # Generated data has many unreachable objects
+    logging.basicConfig(level=logging.ERROR)
+    RESULTS = {
+        'python': platform.python_version(),
+        'parameters': {
+            'fan_out': ARGS.fan_out,
+            'fan_in': ARGS.fan_in,
+            'cycle_density': ARGS.cycle_density,
+            'queries': ARGS.queries,
+            'seed': ARGS.seed,
+        },
+        'scales': [],
+    }  # type: Dict[str, Any]
+    for SCALE in ARGS.scales:
+        RESULTS['scales'].append(measure(ARGS, SCALE))
+        print(
+            "{objects} objects, {transitions} transitions".format(
+                **RESULTS['scales'][-1]),
+            file=sys.stderr)
+    if ARGS.output:
+        with open(ARGS.output, 'w') as OUT_FILE:
+            json.dump(RESULTS, OUT_FILE, indent=2, sort_keys=True)
+    else:
+        json.dump(RESULTS, sys.stdout, indent=2, sort_keys=True)
+        print()
+    if ARGS.compare:
+        compare(RESULTS, ARGS.compare)
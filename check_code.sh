@@ -1,5 +1,6 @@
 #!/usr/bin/env bash
 
-yapf --recursive -d mamaty/ print_object_graphviz.py
-mypy --strict mamaty print_object_graphviz.py
-pylint mamaty print_object_graphviz.py
+yapf --recursive -d mamaty/ tests/ *.py
+mypy --strict mamaty *.py
+pylint mamaty *.py
+python3 -m unittest discover -s tests
@@ -1,3 +1,3 @@
 #!/usr/bin/env bash
 
-./print_object_graphviz.py $1 $2 | dot -Tpng -o$3
+./print_object_graphviz.py "$1" "$2" | dot -Tpng -o"$3"
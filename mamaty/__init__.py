@@ -16,6 +16,17 @@
 # along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
 """Utils for One Hour One Life tech tree"""
 from mamaty.databank import Object, Transition, TransitionType, load_databank
+from mamaty.databank import DatabankUpdate, update_databank
+from mamaty.profiling import Profiler
+from mamaty.cache import data_fingerprint, load_cached_databank
+from mamaty.cache import databank_loader, load_lazy_databank
 from mamaty.graph import GraphNode, NodeObject, NodeTransition, EdgeType, Edge
-from mamaty.graph import Graph, load_databank_graph
+from mamaty.graph import BaseGraph, Graph, load_databank_graph
+from mamaty.compact import CompactGraph, load_snapshot_graph
+from mamaty.shared import attach_graph, export_graph
 from mamaty.subgraph import SubGraph
+from mamaty.ancestors import AncestorIndex, load_or_build_index
+from mamaty.names import NameIndex, load_or_build_names
+from mamaty.forward import ForwardReachability
+from mamaty.querycache import SubGraphCache
+from mamaty.watch import DatabankWatcher, watch_databank_graph
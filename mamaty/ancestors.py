@@ -0,0 +1,192 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Precomputed index of nodes leading to each node"""
+
+import bisect
+import pickle
+from array import array
+from typing import List, Optional, Set, Tuple
+
+from mamaty.components import strongly_connected_components
+from mamaty.graph import BaseGraph
+from mamaty.subgraph import Settings, SubGraph
+
+# Bump when the layout of saved indexes changes
+INDEX_VERSION = 2
+
+
+def _merge_runs(runs: List[Tuple[int, int]]) -> List[int]:
+    """Bounds of the union of half-open runs, as sorted flat (start, end)
+    pairs without overlapping or adjacent runs
+    """
+    runs.sort()
+    bounds = []  # type: List[int]
+    for start, end in runs:
+        if bounds and start <= bounds[-1]:
+            bounds[-1] = max(bounds[-1], end)
+        else:
+            bounds.extend((start, end))
+    return bounds
+
+
+class AncestorIndex:  # pylint: disable=protected-access
+    """Ancestors of every node, following parents of a fresh SubGraph with
+    the given settings. Components of the parent relation are condensed
+    into a DAG, and the ancestors of each component are stored as sorted
+    runs of consecutive components. Components are numbered after their
+    parents, so that ancestors found together get consecutive numbers and
+    runs are few.
+    """
+
+    def __init__(self, graph: BaseGraph,
+                 settings: Optional[Settings] = None) -> None:
+        subgraph = SubGraph(graph)
+        if settings is not None:
+            subgraph.apply_settings(settings)
+        self.graph = graph
+        self.version = graph.version
+        self.settings = subgraph.settings()
+        self.ignored_edges = frozenset(subgraph._ignored_edges)
+        self.node_count = graph.node_count()
+        self.edge_count = graph.edge_count()
+
+        parents = [subgraph._get_parents(i) for i in range(self.node_count)]
+        # Parents are in a component of lower or equal index
+        self.component = strongly_connected_components(self.node_count,
+                                                       parents.__getitem__)
+        component_count = max(self.component) + 1 if self.component else 0
+        self.members = [[] for _ in range(component_count)
+                        ]  # type: List[List[int]]
+        for node, component in enumerate(self.component):
+            self.members[component].append(node)
+
+        # Bounds of the runs of ancestor components, including itself, of
+        # each component: those of component i are between offsets[i] and
+        # offsets[i + 1]
+        self.run_offsets = array('l', [0])
+        self.runs = array('l')
+        # Longest path to an ancestor, in the condensed DAG
+        self.height = [0 for _ in range(component_count)]
+        # Whether there is a cycle among ancestors
+        self.cyclic = [False for _ in range(component_count)]
+        for component, members in enumerate(self.members):
+            others = set()  # type: Set[int]
+            height = 0
+            cyclic = len(members) > 1
+            for node in members:
+                for parent in parents[node]:
+                    other = self.component[parent]
+                    if other == component:
+                        cyclic = True
+                        continue
+                    others.add(other)
+                    height = max(height, self.height[other] + 1)
+                    cyclic = cyclic or self.cyclic[other]
+            runs = [(component, component + 1)]
+            for other in others:
+                bounds = self._runs(other)
+                runs.extend(zip(bounds[::2], bounds[1::2]))
+            self.runs.extend(_merge_runs(runs))
+            self.run_offsets.append(len(self.runs))
+            self.height[component] = height
+            self.cyclic[component] = cyclic
+
+    def _runs(self, component: int) -> 'array[int]':
+        """Bounds of the runs of ancestor components of component"""
+        return self.runs[self.run_offsets[component]:self.run_offsets[component
+                                                                      + 1]]
+
+    def leads_to(self, node: int, target: int) -> bool:
+        """Whether node is an ancestor of target"""
+        # Inside a run if after an odd number of bounds
+        return bisect.bisect_right(
+            self._runs(self.component[target]), self.component[node]) % 2 == 1
+
+    def ancestors_of(self, node: int) -> Set[int]:
+        """All nodes leading to node, including itself"""
+        bounds = self._runs(self.component[node])
+        return set(member for start, end in zip(bounds[::2], bounds[1::2])
+                   for component in range(start, end)
+                   for member in self.members[component])
+
+    def is_usable(self, subgraph: SubGraph) -> bool:
+        """Whether the index matches the subgraph before leading_to_obj"""
+        return subgraph.graph is self.graph and \
+            self.graph.version == self.version and \
+            subgraph.settings()[1:] == self.settings[1:] and \
+            not subgraph.ignored_nodes and \
+            subgraph._ignored_edges == self.ignored_edges
+
+    def leading_to_obj(self, subgraph: SubGraph, obj: int) -> None:
+        """Same as subgraph.leading_to_obj, answered from the index when
+        max_distance cannot cut the traversal: the distance of a node is
+        at most the height of its component if no ancestor is in a cycle.
+        """
+        start = self.graph.obj_to_node[obj]
+        component = self.component[start]
+        may_cut = subgraph.max_distance > 0 and (
+            self.cyclic[component]
+            or self.height[component] > subgraph.max_distance)
+        if may_cut or not self.is_usable(subgraph):
+            subgraph.leading_to_obj(obj)
+            return
+        subgraph.keep_nodes(self.ancestors_of(start))
+
+    def save(self, filename: str, data_version: str = '') -> None:
+        """Save the index, data_version identifying the databank"""
+        with open(filename, 'wb') as out_file:
+            pickle.dump(
+                (INDEX_VERSION, data_version, self.node_count, self.edge_count,
+                 self.settings, self.ignored_edges, self.component,
+                 self.run_offsets, self.runs, self.height, self.cyclic),
+                out_file, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename: str, graph: BaseGraph,
+             data_version: str = '') -> Optional['AncestorIndex']:
+        """Load an index saved for this graph, or None if not matching"""
+        try:
+            with open(filename, 'rb') as in_file:
+                data = pickle.load(in_file)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        if data[:4] != (INDEX_VERSION, data_version, graph.node_count(),
+                        graph.edge_count()) or data[5] != graph.looping_edges:
+            return None
+        index = cls.__new__(cls)
+        index.graph = graph
+        index.version = graph.version
+        index.node_count, index.edge_count, index.settings, \
+            index.ignored_edges, index.component, index.run_offsets, \
+            index.runs, index.height, index.cyclic = data[2:]
+        index.members = [[] for _ in range(len(index.height))]
+        for node, component in enumerate(index.component):
+            index.members[component].append(node)
+        return index
+
+
+def load_or_build_index(filename: str,
+                        graph: BaseGraph,
+                        data_version: str = '',
+                        settings: Optional[Settings] = None) -> AncestorIndex:
+    """Load the index if saved for this graph, otherwise build and save it"""
+    index = AncestorIndex.load(filename, graph, data_version)
+    if index is None or (settings is not None
+                         and index.settings[1:] != settings[1:]):
+        index = AncestorIndex(graph, settings)
+        index.save(filename, data_version)
+    return index
@@ -0,0 +1,138 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Render graphs of many objects in a single process"""
+
+import multiprocessing
+import multiprocessing.pool
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import wait
+from functools import partial
+from typing import Iterable, List, Optional, Set, TextIO, Tuple
+
+from mamaty.graph import BaseGraph
+from mamaty.shared import attach_graph, export_graph
+from mamaty.subgraph import SubGraph
+
+# Graph shared with the pool processes, inherited when they are forked
+_GRAPH = None  # type: Optional[BaseGraph]
+
+
+def reachable_objects(graph: BaseGraph) -> List[int]:
+    """Identifiers of all objects that can be made"""
+    return [i for i in graph.obj_to_node if i not in graph.unreachable]
+
+
+def _set_graph(graph: BaseGraph) -> None:
+    global _GRAPH  # pylint: disable=global-statement
+    _GRAPH = graph
+
+
+def _attach_graph(filename: str) -> None:
+    _set_graph(attach_graph(filename))
+
+
+def _graphviz(object_id: int) -> Tuple[int, str, float]:
+    """Graphviz leading to object, and time taken to make it"""
+    assert _GRAPH is not None
+    start = time.perf_counter()
+    subgraph = SubGraph(_GRAPH)
+    subgraph.leading_to_obj(object_id)
+    return object_id, subgraph.to_graphviz(), time.perf_counter() - start
+
+
+def _pool(graph: BaseGraph, processes: int,
+          shared_file: Optional[str]) -> multiprocessing.pool.Pool:
+    """Pool of processes sharing the graph, through the memory-mapped file
+    if given, otherwise by fork when possible.
+    """
+    if shared_file is not None:
+        export_graph(graph, shared_file)
+        return multiprocessing.Pool(processes, _attach_graph, (shared_file, ))
+    _set_graph(graph)
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork').Pool(processes)
+    return multiprocessing.Pool(processes, _set_graph, (graph, ))
+
+
+def _run_dot(dot: str, output_format: str, filename: str,
+             graphviz: str) -> float:
+    """Render a graphviz to a file, return the time taken"""
+    start = time.perf_counter()
+    subprocess.run(
+        [dot, '-T' + output_format, '-o' + filename],
+        input=graphviz.encode(),
+        check=True)
+    return time.perf_counter() - start
+
+
+def render_objects(graph: BaseGraph,
+                   object_ids: Iterable[int],
+                   output_pattern: str,
+                   processes: int = 1,
+                   dot_workers: int = 1,
+                   output_format: str = 'png',
+                   dot: str = 'dot',
+                   progress: Optional[TextIO] = None,
+                   shared_file: Optional[str] = None) -> None:
+    """Render the graph leading to each object to a file.
+    Graphs are computed by a pool of processes, and given to at most
+    dot_workers dot processes at once. The output file name is given by
+    output_pattern, formatted with the object identifier. With a shared
+    file, processes read the graph from it without copying it.
+    Each rendered object, or dot failure, is reported on progress, the
+    standard error by default, and the first failure is raised at the end.
+    """
+    object_ids = list(object_ids)
+    out = sys.stderr if progress is None else progress
+    done = 0
+    lock = threading.Lock()
+
+    def _report(object_id: int, graph_time: float,
+                future: 'Future[float]') -> None:
+        nonlocal done
+        error = future.exception()
+        with lock:
+            done += 1
+            if error is None:
+                out.write("[{}/{}] {}: graph {:.3f} s, dot {:.3f} s\n".format(
+                    done, len(object_ids), object_id, graph_time,
+                    future.result()))
+            else:
+                out.write("[{}/{}] {}: dot failed: {}\n".format(
+                    done, len(object_ids), object_id, error))
+
+    with _pool(graph, processes, shared_file) as pool, \
+            ThreadPoolExecutor(dot_workers) as executor:
+        futures = []  # type: List[Future[float]]
+        # Graphs given to dot and not rendered yet, at most two per worker
+        pending = set()  # type: Set[Future[float]]
+        for object_id, graphviz, graph_time in pool.imap_unordered(
+                _graphviz, object_ids):
+            if len(pending) >= dot_workers * 2:
+                pending = wait(pending, return_when=FIRST_COMPLETED).not_done
+            future = executor.submit(_run_dot, dot, output_format,
+                                     output_pattern.format(object_id),
+                                     graphviz)
+            future.add_done_callback(partial(_report, object_id, graph_time))
+            futures.append(future)
+            pending.add(future)
+        for future in futures:
+            future.result()
@@ -0,0 +1,301 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Compiled on-disk cache of the game data bank"""
+
+import hashlib
+import os
+import pickle
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from mamaty.databank import DatabankLoader, LazyObject, Object, Transition
+from mamaty.databank import link_databank, load_databank
+from mamaty.databank import parse_all_categories, read_transition_columns
+from mamaty.databank import transitions_from_columns
+from mamaty.profiling import NO_PROFILER, Profiler
+
+# Bump when the layout of the cached columns changes
+CACHE_VERSION = 2
+
+# Bump when the layout of the natural status index changes
+NATURAL_INDEX_VERSION = 1
+
+DATA_FOLDERS = ('objects', 'transitions', 'categories')
+
+
+def scan_data_files(root_folder: str) -> Dict[str, Tuple[int, int]]:
+    """Modification time and size of every data file, by relative path"""
+    files = {}  # type: Dict[str, Tuple[int, int]]
+    for folder in DATA_FOLDERS:
+        try:
+            entries = list(os.scandir(root_folder + '/' + folder))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.name.endswith('.txt'):
+                stat = entry.stat()
+                files[folder + '/' + entry.name] = (stat.st_mtime_ns,
+                                                    stat.st_size)
+    return files
+
+
+def data_fingerprint(root_folder: str) -> str:
+    """Hash identifying the current state of the game data folder"""
+    sha = hashlib.sha1()
+    for path, (mtime, size) in sorted(scan_data_files(root_folder).items()):
+        sha.update("{}:{}:{}\n".format(path, mtime, size).encode())
+    return sha.hexdigest()
+
+
+def databank_to_columns(objects: Dict[int, Object],
+                        transitions: List[Transition]) -> Dict[str, Any]:
+    """Flatten a loaded databank into compact columns"""
+    return {
+        'object_id':
+        array('l', objects.keys()),
+        'object_name': [obj.name for obj in objects.values()],
+        'object_natural':
+        bytes(obj.is_natural for obj in objects.values()),
+        'category': [(obj.identifier,
+                      array('l', (i.identifier
+                                  for i in obj.category_contains)))
+                     for obj in objects.values() if obj.is_category],
+        'actor':
+        array('l', (t.actor for t in transitions)),
+        'target':
+        array('l', (t.target for t in transitions)),
+        'new_actor':
+        array('l', (t.new_actor for t in transitions)),
+        'new_target':
+        array('l', (t.new_target for t in transitions)),
+        'last_use_actor':
+        bytes(t.last_use_actor for t in transitions),
+        'last_use_target':
+        bytes(t.last_use_target for t in transitions),
+        'auto_decay_seconds':
+        array('l', (t.auto_decay_seconds for t in transitions)),
+        'actor_min_use_fraction':
+        array('d', (t.actor_min_use_fraction for t in transitions)),
+        'target_min_use_fraction':
+        array('d', (t.target_min_use_fraction for t in transitions)),
+        'reverse_use_actor_flag':
+        array('l', (t.reverse_use_actor_flag for t in transitions)),
+        'reverse_use_target_flag':
+        array('l', (t.reverse_use_target_flag for t in transitions)),
+        'move':
+        array('l', (t.move for t in transitions)),
+        'desired_move_dist':
+        array('l', (t.desired_move_dist for t in transitions)),
+    }
+
+
+def databank_from_columns(
+        columns: Dict[str, Any]) -> Tuple[Dict[int, Object], List[Transition]]:
+    """Rebuild objects and transitions from columns, without any parsing"""
+    objects = {
+        identifier: Object(identifier, name, bool(natural))
+        for identifier, name, natural in zip(columns['object_id'], columns[
+            'object_name'], columns['object_natural'])
+    }
+    transitions = transitions_from_columns(columns)
+    for transition in transitions:
+        transition.add_to_objects(objects)
+    for parent, content in columns['category']:
+        objects[parent].set_category([objects[i] for i in content])
+    return objects, transitions
+
+
+def read_databank_columns(root_folder: str,
+                          workers: int = 1,
+                          profiler: Profiler = NO_PROFILER) -> Dict[str, Any]:
+    """Same columns as databank_to_columns, read from the data folder
+    without creating transitions
+    """
+    with profiler.phase('objects') as phase:
+        objects = Object.parse_all(root_folder + '/objects', workers)
+        phase.counts['objects'] = len(objects)
+    with profiler.phase('categories'):
+        parse_all_categories(root_folder + '/categories', objects)
+    columns = databank_to_columns(objects, [])
+    with profiler.phase('transitions') as phase:
+        columns.update(
+            read_transition_columns(root_folder + '/transitions', workers))
+        phase.counts['transitions'] = len(columns['actor'])
+    return columns
+
+
+def _read_cache(cache_file: str, fingerprint: str) -> Any:
+    """Return cached columns, or None if missing or outdated"""
+    try:
+        with open(cache_file, 'rb') as in_file:
+            version, cached_fingerprint = pickle.load(in_file)
+            if version != CACHE_VERSION or cached_fingerprint != fingerprint:
+                return None
+            return pickle.load(in_file)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        return None
+
+
+def _write_cache(cache_file: str, fingerprint: str,
+                 columns: Dict[str, Any]) -> None:
+    """Atomically replace the cache file"""
+    tmp_file = "{}.{}.tmp".format(cache_file, os.getpid())
+    with open(tmp_file, 'wb') as out_file:
+        pickle.dump((CACHE_VERSION, fingerprint), out_file,
+                    pickle.HIGHEST_PROTOCOL)
+        pickle.dump(columns, out_file, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+
+
+def load_cached_databank(root_folder: str,
+                         cache_file: str,
+                         workers: int = 1,
+                         profiler: Profiler = NO_PROFILER
+                         ) -> Tuple[Dict[int, Object], List[Transition]]:
+    """Same as load_databank, but go through a compiled cache file.
+    The cache is rebuilt whenever a data file is added, removed or modified.
+    """
+    with profiler.phase('fingerprint'):
+        fingerprint = data_fingerprint(root_folder)
+    with profiler.phase('read cache'):
+        columns = _read_cache(cache_file, fingerprint)
+    if columns is not None:
+        with profiler.phase('columns'):
+            return databank_from_columns(columns)
+    objects, transitions = load_databank(root_folder, workers, profiler)
+    with profiler.phase('write cache'):
+        _write_cache(cache_file, fingerprint,
+                     databank_to_columns(objects, transitions))
+    return objects, transitions
+
+
+def load_cached_columns(root_folder: str,
+                        cache_file: str,
+                        workers: int = 1,
+                        profiler: Profiler = NO_PROFILER) -> Dict[str, Any]:
+    """Same as read_databank_columns, but go through the compiled cache
+    file of load_cached_databank
+    """
+    with profiler.phase('fingerprint'):
+        fingerprint = data_fingerprint(root_folder)
+    with profiler.phase('read cache'):
+        columns = _read_cache(cache_file, fingerprint)
+    if columns is None:
+        columns = read_databank_columns(root_folder, workers, profiler)
+        with profiler.phase('write cache'):
+            _write_cache(cache_file, fingerprint, columns)
+    return columns  # type: ignore
+
+
+def _read_natural_index(index_file: str) -> Dict[int, Tuple[int, int, bool]]:
+    """Modification time, size and natural status by object identifier"""
+    try:
+        with open(index_file, 'rb') as in_file:
+            version, index = pickle.load(in_file)
+            if version == NATURAL_INDEX_VERSION:
+                return index  # type: ignore
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+    return {}
+
+
+def _write_natural_index(index_file: str,
+                         index: Dict[int, Tuple[int, int, bool]]) -> None:
+    """Atomically replace the natural status index"""
+    tmp_file = "{}.{}.tmp".format(index_file, os.getpid())
+    with open(tmp_file, 'wb') as out_file:
+        pickle.dump((NATURAL_INDEX_VERSION, index), out_file,
+                    pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, index_file)
+
+
+def load_lazy_objects(object_folder: str,
+                      index_file: str) -> Dict[int, Object]:
+    """Objects of the folder, only reading files missing from the natural
+    status index or modified since. The index is updated if needed.
+    """
+    try:
+        with open(object_folder + "/nextObjectNumber.txt", 'r') as in_file:
+            next_object = int(in_file.read())
+    except (FileNotFoundError, ValueError):
+        return {}
+    index = _read_natural_index(index_file)
+    updated = {}  # type: Dict[int, Tuple[int, int, bool]]
+    objects = {}  # type: Dict[int, Object]
+    entries = {entry.name: entry for entry in os.scandir(object_folder)}
+    # In increasing identifiers, like Object.parse_all
+    for identifier in range(1, next_object):
+        entry = entries.get("{}.txt".format(identifier))
+        if entry is None:
+            continue
+        stat = entry.stat()
+        state = index.get(identifier)
+        if state is None or state[:2] != (stat.st_mtime_ns, stat.st_size):
+            try:
+                obj = Object.from_file(entry.path)
+            except ValueError:
+                continue
+            state = (stat.st_mtime_ns, stat.st_size, obj.is_natural)
+            objects[obj.identifier] = obj
+        else:
+            objects[identifier] = LazyObject(identifier, object_folder,
+                                             state[2])
+        updated[identifier] = state
+    if updated != index:
+        _write_natural_index(index_file, updated)
+    objects[0] = Object(0, "Bare Hands", True)
+    return objects
+
+
+def load_lazy_databank(root_folder: str,
+                       index_file: str,
+                       workers: int = 1,
+                       profiler: Profiler = NO_PROFILER
+                       ) -> Tuple[Dict[int, Object], List[Transition]]:
+    """Same as load_databank, but object files are only read when their
+    name is needed, their natural status being kept in an index file.
+    """
+    with profiler.phase('objects') as phase:
+        objects = load_lazy_objects(root_folder + '/objects', index_file)
+        phase.counts['objects'] = len(objects)
+    return objects, link_databank(root_folder, objects, workers, profiler)
+
+
+def databank_loader(cache_file: Optional[str] = None,
+                    lazy_index_file: Optional[str] = None) -> DatabankLoader:
+    """How to load the databank: through the cache file if given, or with
+    lazy objects if given a lazy index file, see load_lazy_databank
+    """
+    if lazy_index_file is not None:
+        index_file = lazy_index_file
+
+        def load_lazy(root_folder: str, workers: int, profiler: Profiler
+                      ) -> Tuple[Dict[int, Object], List[Transition]]:
+            return load_lazy_databank(root_folder, index_file, workers,
+                                      profiler)
+
+        return load_lazy
+    if cache_file is not None:
+        cached_file = cache_file
+
+        def load_cached(root_folder: str, workers: int, profiler: Profiler
+                        ) -> Tuple[Dict[int, Object], List[Transition]]:
+            return load_cached_databank(root_folder, cached_file, workers,
+                                        profiler)
+
+        return load_cached
+    return load_databank
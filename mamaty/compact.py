@@ -0,0 +1,542 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Read-only graph stored in flat typed arrays"""
+
+import bisect
+import os
+import pickle
+from array import array
+from typing import AbstractSet, Any, Dict, Iterable, Iterator, List, Mapping
+from typing import MutableSequence, Optional, Sequence, Tuple, TypeVar
+
+from mamaty.cache import data_fingerprint, databank_from_columns
+from mamaty.cache import databank_to_columns, load_cached_columns
+from mamaty.cache import read_databank_columns
+from mamaty.components import component_members
+from mamaty.databank import TRANSITION_COLUMNS, transition_type
+from mamaty.graph import BaseGraph, EdgeType, Graph, GraphNode
+from mamaty.graph import object_graphviz_decl, transition_edge_type
+from mamaty.graph import transition_graphviz_decl, transition_graphviz_name
+from mamaty.profiling import NO_PROFILER, Profiler
+
+_T = TypeVar('_T')
+
+_EDGE_TYPES = list(EdgeType)
+
+# Bump when the layout of saved graphs changes
+SNAPSHOT_VERSION = 3
+
+# Arrays computed from the others, filled by CompactGraph.from_columns
+_COMPUTED = ('unreachable', 'scc', 'component_offsets', 'component_nodes',
+             'looping')
+
+# Type codes of transition columns, the others being 'l'
+_TRANSITION_TYPECODES = {
+    'last_use_actor': 'b',
+    'last_use_target': 'b',
+    'actor_min_use_fraction': 'd',
+    'target_min_use_fraction': 'd',
+}
+
+
+def _zeros(typecode: str, length: int) -> 'array[Any]':
+    return array(typecode, bytes(array(typecode).itemsize * length))
+
+
+def _csr(count: int, keys: Sequence[int]) -> Tuple['array[int]', 'array[int]']:
+    """Offsets and positions of the given keys, as CSR: positions with key
+    i are between offsets[i] and offsets[i + 1], in increasing order
+    """
+    offsets = _zeros('l', count + 1)
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    position = array('l', offsets[:-1])
+    positions = _zeros('l', len(keys))
+    for index, key in enumerate(keys):
+        positions[position[key]] = index
+        position[key] += 1
+    return offsets, positions
+
+
+def _flatten(
+        lists: Iterable[Iterable[int]]) -> Tuple['array[int]', 'array[int]']:
+    """Offsets and values of lists, as CSR"""
+    offsets = array('l', [0])
+    values = array('l')
+    for values_ in lists:
+        values.extend(values_)
+        offsets.append(len(values))
+    return offsets, values
+
+
+class _Slices(Sequence[Sequence[int]]):
+    """Values of each index, as slices of a CSR array"""
+
+    def __init__(self, offsets: Sequence[int], values: Sequence[int]) -> None:
+        self._offsets = offsets
+        self._values = values
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self._values[self._offsets[index]:self._offsets[index + 1]]
+
+
+class _ObjectNodes(Mapping[int, int]):
+    """Node of each object identifier, in the order of nodes"""
+
+    def __init__(self, object_id: Sequence[int],
+                 object_node: Sequence[int]) -> None:
+        self._object_id = object_id
+        self._object_node = object_node
+
+    def __getitem__(self, identifier: int) -> int:
+        if 0 <= identifier < len(self._object_node):
+            node = self._object_node[identifier]
+            if node >= 0:
+                return node
+        raise KeyError(identifier)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._object_id)
+
+    def __len__(self) -> int:
+        return len(self._object_id)
+
+
+class _SortedIds(AbstractSet[int]):
+    """Set of identifiers kept in a sorted array"""
+
+    def __init__(self, ids: Sequence[int]) -> None:
+        self._ids = ids
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[_T]) -> AbstractSet[_T]:
+        # Results of set operations are plain sets
+        return frozenset(it)
+
+    def __contains__(self, identifier: object) -> bool:
+        if not isinstance(identifier, int):
+            return False
+        index = bisect.bisect_left(self._ids, identifier)
+        return index < len(self._ids) and self._ids[index] == identifier
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class CompactGraph(BaseGraph):
+    """Read-only graph keeping its objects, transitions, nodes, edges and
+    everything computed from them in typed arrays, without any Object,
+    Transition, node or edge instance. Object nodes come first, then a
+    node per transition, so that node object_count() + i is transition i.
+    Lists of lists are stored as CSR: values of index i are between
+    offsets[i] and offsets[i + 1].
+    """
+
+    def __init__(self, arrays: Dict[str, Any]) -> None:
+        super().__init__()
+        self._arrays = arrays
+        self._attach()
+
+    def _attach(self) -> None:
+        """Set attributes and views from the arrays"""
+        arrays = self._arrays
+        # Objects with a node: identifier, natural status, utf-8 name and
+        # identifiers of objects contained by categories
+        self._object_id = arrays['object_id']  # type: Sequence[int]
+        self._object_natural = arrays['object_natural']  # type: Sequence[int]
+        self._name_offsets = arrays['name_offsets']  # type: Sequence[int]
+        self._names = arrays['names']  # type: Sequence[int]
+        self._category_offsets = arrays[
+            'category_offsets']  # type: Sequence[int]
+        self._category_members = arrays[
+            'category_members']  # type: Sequence[int]
+        self._object_node = arrays['object_node']  # type: Sequence[int]
+        self._transition_count = len(arrays['actor'])
+        self._complexity = arrays['complexity']  # type: MutableSequence[int]
+        # Edges, whose category is the value of its EdgeType
+        self._edge_from = arrays['edge_from']  # type: Sequence[int]
+        self._edge_to = arrays['edge_to']  # type: Sequence[int]
+        self._edge_category = arrays['edge_category']  # type: Sequence[int]
+        self._edge_looping = arrays[
+            'edge_looping']  # type: MutableSequence[int]
+        self._out_offsets = arrays['out_offsets']  # type: Sequence[int]
+        self._out_edge_ids = arrays['out_edge_ids']  # type: Sequence[int]
+        self._in_offsets = arrays['in_offsets']  # type: Sequence[int]
+        self._in_edge_ids = arrays['in_edge_ids']  # type: Sequence[int]
+
+        self.obj_to_node = _ObjectNodes(self._object_id, self._object_node)
+        self.unreachable = _SortedIds(arrays['unreachable'])
+        self.looping_edges = _SortedIds(arrays['looping'])
+        self.scc = arrays['scc']
+        self.components = _Slices(arrays['component_offsets'],
+                                  arrays['component_nodes'])
+
+    def arrays(self) -> Dict[str, Any]:
+        """The arrays holding the whole graph, by name"""
+        return self._arrays
+
+    @classmethod
+    def from_columns(cls,
+                     columns: Dict[str, Any],
+                     profiler: Profiler = NO_PROFILER) -> 'CompactGraph':
+        """Graph of databank columns, as made by databank_to_columns. Nodes
+        and edges are the same as the ones of a Graph of the databank.
+        """
+        with profiler.phase('create') as phase:
+            arrays = _databank_arrays(columns)
+            _add_edges(arrays)
+            phase.counts['nodes'] = _node_count(arrays)
+            phase.counts['edges'] = len(arrays['edge_from'])
+        with profiler.phase('adjacency'):
+            _add_adjacency(arrays)
+        arrays['complexity'] = _zeros('q', _node_count(arrays))
+        arrays['edge_looping'] = _zeros('b', len(arrays['edge_from']))
+        for name in _COMPUTED:
+            arrays[name] = array('l')
+        graph = cls(arrays)
+        graph._compute(profiler)
+        return graph
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> 'CompactGraph':
+        """Graph with the same nodes and edges as graph, whose
+        complexities, components and loops are copied, not computed again
+        """
+        arrays = _databank_arrays(databank_to_columns(*graph.databank()))
+        edges = range(graph.edge_count())
+        ends = [graph.edge_ends(edge) for edge in edges]
+        arrays['edge_from'] = array('l', (from_node for from_node, _ in ends))
+        arrays['edge_to'] = array('l', (to_node for _, to_node in ends))
+        arrays['edge_category'] = array(
+            'b', (graph.edge_category(edge).value for edge in edges))
+        _add_adjacency(arrays)
+        arrays['complexity'] = array('q',
+                                     (graph.complexity(node)
+                                      for node in range(graph.node_count())))
+        looping = graph.looping_edges
+        arrays['edge_looping'] = array('b',
+                                       (edge in looping for edge in edges))
+        arrays['unreachable'] = array('l', sorted(graph.unreachable))
+        arrays['scc'] = array('l', graph.scc)
+        arrays['component_offsets'], arrays['component_nodes'] = _flatten(
+            graph.components)
+        arrays['looping'] = array('l', sorted(looping))
+        return cls(arrays)
+
+    def _compute(self, profiler: Profiler) -> None:
+        """Compute complexities, components and loops, like a Graph"""
+        arrays = self._arrays
+        with profiler.phase('complexity'):
+            for node in range(self.node_count()):
+                self._reset_complexity(node)
+            self._propagate_complexity(None)
+            arrays['unreachable'] = array(
+                'l',
+                sorted(identifier for identifier, complexity in zip(
+                    self._object_id, self._complexity)
+                       if complexity == GraphNode.DEFAULT_COMPLEXITY))
+            self._attach()
+            self._warn_unreachable()
+
+        with profiler.phase('components') as phase:
+            scc = self._find_components(None, None)
+            arrays['scc'] = array('l', scc)
+            arrays['component_offsets'], arrays['component_nodes'] = \
+                _flatten(component_members(scc))
+            self._attach()
+            phase.counts['components'] = len(self.components)
+
+        with profiler.phase('loops'):
+            self._mark_loops(None)
+            arrays['looping'] = array(
+                'l',
+                (i for i, looping in enumerate(self._edge_looping) if looping))
+            self._attach()
+
+    def object_count(self) -> int:
+        """Number of object nodes, coming before transition nodes"""
+        return len(self._object_id)
+
+    def node_count(self) -> int:
+        return len(self._object_id) + self._transition_count
+
+    def edge_count(self) -> int:
+        return len(self._edge_from)
+
+    def get_out(self, node: int) -> Iterator[Tuple[int, int]]:
+        edge_to = self._edge_to
+        offsets = self._out_offsets
+        for edge_n in self._out_edge_ids[offsets[node]:offsets[node + 1]]:
+            yield (edge_to[edge_n], edge_n)
+
+    def get_in(self, node: int) -> Iterator[Tuple[int, int]]:
+        edge_from = self._edge_from
+        offsets = self._in_offsets
+        for edge_n in self._in_edge_ids[offsets[node]:offsets[node + 1]]:
+            yield (edge_from[edge_n], edge_n)
+
+    def complexity(self, node: int) -> int:
+        return self._complexity[node]
+
+    def _set_complexity(self, node: int, complexity: int) -> None:
+        self._complexity[node] = complexity
+
+    def is_transition(self, node: int) -> bool:
+        return node >= len(self._object_id)
+
+    def object_id(self, node: int) -> int:
+        return self._object_id[node]
+
+    def object_name(self, node: int) -> str:
+        offsets = self._name_offsets
+        return bytes(self._names[offsets[node]:offsets[node + 1]]).decode()
+
+    def is_natural(self, node: int) -> bool:
+        return bool(self._object_natural[node])
+
+    def is_category(self, node: int) -> bool:
+        return not self.is_transition(node) and \
+            self._category_offsets[node] != self._category_offsets[node + 1]
+
+    def category_contents(self, node: int) -> List[int]:
+        offsets = self._category_offsets
+        return list(self._category_members[offsets[node]:offsets[node + 1]])
+
+    def edge_ends(self, edge: int) -> Tuple[int, int]:
+        return self._edge_from[edge], self._edge_to[edge]
+
+    def edge_category(self, edge: int) -> EdgeType:
+        return _EDGE_TYPES[self._edge_category[edge]]
+
+    def edge_seconds(self, edge: int) -> int:
+        # Only edges from the inputs of a transition lead to its node
+        to_node = self._edge_to[edge]
+        if not self.is_transition(to_node):
+            return 0
+        seconds = self._arrays['auto_decay_seconds']  # type: Sequence[int]
+        return seconds[to_node - len(self._object_id)]
+
+    def _set_looping(self, edge: int, looping: bool) -> None:
+        self._edge_looping[edge] = looping
+
+    def _graphviz_decl(self, node: int) -> str:
+        if self.is_transition(node):
+            return transition_graphviz_decl(self._graphviz_name(node))
+        return object_graphviz_decl(self._object_id[node],
+                                    self.object_name(node),
+                                    self._complexity[node])
+
+    def _graphviz_name(self, node: int) -> str:
+        if not self.is_transition(node):
+            return '{}'.format(self._object_id[node])
+        arrays = self._arrays
+        transition = node - len(self._object_id)
+        return transition_graphviz_name(
+            arrays['actor'][transition], arrays['target'][transition],
+            bool(arrays['last_use_actor'][transition]),
+            bool(arrays['last_use_target'][transition]))
+
+    def to_graph(self) -> Graph:
+        """Expand into a Graph, which can be updated, without computing
+        anything again
+        """
+        arrays = self._arrays
+        columns = {name: arrays[name] for name in TRANSITION_COLUMNS}
+        # Bare hands come last, like in Object.parse_all
+        columns['object_id'] = array('l', arrays['object_id']) + array(
+            'l', [0])
+        columns['object_name'] = [
+            self.object_name(node) for node in range(self.object_count())
+        ] + ["Bare Hands"]
+        columns['object_natural'] = bytes(arrays['object_natural']) + b'\x01'
+        columns['category'] = [(self.object_id(node),
+                                self.category_contents(node))
+                               for node in range(self.object_count())
+                               if self.is_category(node)]
+        objects, transitions = databank_from_columns(columns)
+        return Graph.from_computed(objects, transitions, self._complexity,
+                                   self.looping_edges, self.scc)
+
+
+def _object_arrays(columns: Dict[str, Any]) -> Dict[str, Any]:
+    """Arrays of the objects of columns having a node, bare hands having
+    none
+    """
+    kept = [
+        i for i, identifier in enumerate(columns['object_id'])
+        if identifier > 0
+    ]
+    object_id = array('l', (columns['object_id'][i] for i in kept))
+    names = [columns['object_name'][i].encode() for i in kept]
+    object_node = array('l', [-1]) * (max(object_id, default=0) + 1)
+    for node, identifier in enumerate(object_id):
+        object_node[identifier] = node
+    contents = dict(columns['category'])
+    category_offsets, category_members = _flatten(
+        contents.get(identifier, ()) for identifier in object_id)
+    name_offsets = array('l', [0])
+    for name in names:
+        name_offsets.append(name_offsets[-1] + len(name))
+    return {
+        'object_id':
+        object_id,
+        'object_natural':
+        array('b', (columns['object_natural'][i] for i in kept)),
+        'name_offsets':
+        name_offsets,
+        'names':
+        array('B', b''.join(names)),
+        'category_offsets':
+        category_offsets,
+        'category_members':
+        category_members,
+        'object_node':
+        object_node,
+    }
+
+
+def _databank_arrays(columns: Dict[str, Any]) -> Dict[str, Any]:
+    """Arrays of the objects and transitions of columns"""
+    arrays = _object_arrays(columns)
+    for name in TRANSITION_COLUMNS:
+        arrays[name] = array(
+            _TRANSITION_TYPECODES.get(name, 'l'), columns[name])
+    return arrays
+
+
+def _node_count(arrays: Dict[str, Any]) -> int:
+    """Number of nodes: one per object having a node, and per transition"""
+    return len(arrays['object_id']) + len(arrays['actor'])
+
+
+def _add_adjacency(arrays: Dict[str, Any]) -> None:
+    """Add the out and incoming edges of each node, as CSR"""
+    node_count = _node_count(arrays)
+    arrays['out_offsets'], arrays['out_edge_ids'] = _csr(
+        node_count, arrays['edge_from'])
+    arrays['in_offsets'], arrays['in_edge_ids'] = _csr(node_count,
+                                                       arrays['edge_to'])
+
+
+def _add_edges(arrays: Dict[str, Any]) -> None:
+    """Add edges between the nodes of the objects and transitions of
+    arrays, in the order of Graph: category edges, then the edges of
+    each transition
+    """
+    object_node = arrays['object_node']
+    edge_from, edge_to = array('l'), array('l')
+    edge_category = array('b')
+
+    def add(from_node: int, to_node: int, category: EdgeType) -> None:
+        edge_from.append(from_node)
+        edge_to.append(to_node)
+        edge_category.append(category.value)
+
+    offsets = arrays['category_offsets']
+    for node in range(len(arrays['object_id'])):
+        for contained in arrays['category_members'][offsets[node]:offsets[
+                node + 1]]:
+            add(object_node[contained], node, EdgeType.CATEGORY)
+    node = len(arrays['object_id'])
+    for actor, target, new_actor, new_target in zip(
+            arrays['actor'], arrays['target'], arrays['new_actor'],
+            arrays['new_target']):
+        inputs = [i for i in (actor, target) if i > 0]
+        outputs = [i for i in (new_actor, new_target) if i > 0]
+        for output in outputs:
+            if output not in inputs:
+                add(node, object_node[output], EdgeType.TRANSITION)
+        for input_ in inputs:
+            edge_type = transition_edge_type(transition_type(actor, target))
+            if edge_type == EdgeType.CONSUME and input_ in outputs:
+                edge_type = EdgeType.TOOL
+            add(object_node[input_], node, edge_type)
+        node += 1
+    arrays['edge_from'] = edge_from
+    arrays['edge_to'] = edge_to
+    arrays['edge_category'] = edge_category
+
+
+def save_snapshot(graph: CompactGraph,
+                  snapshot_file: str,
+                  data_version: str = '') -> None:
+    """Atomically save a computed graph, data_version identifying the
+    databank it was computed from.
+    """
+    tmp_file = "{}.{}.tmp".format(snapshot_file, os.getpid())
+    with open(tmp_file, 'wb') as out_file:
+        pickle.dump((SNAPSHOT_VERSION, data_version), out_file,
+                    pickle.HIGHEST_PROTOCOL)
+        pickle.dump(graph.arrays(), out_file, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, snapshot_file)
+
+
+def load_snapshot(snapshot_file: str,
+                  data_version: str = '') -> Optional[CompactGraph]:
+    """Load a saved graph, or None if missing or of another data version.
+    None of the graph computations are done again.
+    """
+    try:
+        with open(snapshot_file, 'rb') as in_file:
+            version, saved_data_version = pickle.load(in_file)
+            if version != SNAPSHOT_VERSION or \
+                    saved_data_version != data_version:
+                return None
+            arrays = pickle.load(in_file)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        return None
+    return CompactGraph(arrays)
+
+
+def load_snapshot_graph(root_folder: str,
+                        snapshot_file: str,
+                        workers: int = 1,
+                        profiler: Profiler = NO_PROFILER,
+                        cache_file: Optional[str] = None) -> CompactGraph:
+    """Same as load_databank_graph, but read-only and going through a
+    snapshot of the computed graph, made again whenever the game data
+    changes. The databank is read through the cache file if given.
+    """
+    with profiler.phase('fingerprint'):
+        data_version = data_fingerprint(root_folder)
+    with profiler.phase('snapshot'):
+        graph = load_snapshot(snapshot_file, data_version)
+        if graph is not None:
+            return graph
+    with profiler.phase('databank'):
+        if cache_file is not None:
+            columns = load_cached_columns(root_folder, cache_file, workers,
+                                          profiler)
+        else:
+            columns = read_databank_columns(root_folder, workers, profiler)
+    with profiler.phase('graph'):
+        computed = CompactGraph.from_columns(columns, profiler)
+    with profiler.phase('save snapshot'):
+        save_snapshot(computed, snapshot_file, data_version)
+    return computed
@@ -0,0 +1,117 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Strongly connected components of a graph, and paths inside them"""
+
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+from typing import Tuple
+
+
+def strongly_connected_components(
+        node_count: int,
+        children: Callable[[int], Iterable[int]],
+        roots: Optional[Iterable[int]] = None) -> List[int]:
+    """Tarjan's strongly connected components algorithm, without recursion.
+    Return the component index of each node. Components are numbered in
+    reverse topological order: edges only go to lower or equal indexes.
+    If roots are given, only nodes reachable from them get a component,
+    the others being in component -1.
+    """
+    index = 0
+    indexes = [-1 for _ in range(node_count)]
+    low_link = [-1 for _ in range(node_count)]
+    on_stack = [False for _ in range(node_count)]
+    stack = []  # type: List[int]
+    scc = [-1 for _ in range(node_count)]
+    scc_index = 0
+
+    for root in range(node_count) if roots is None else roots:
+        if indexes[root] != -1:
+            continue
+        indexes[root] = low_link[root] = index
+        index += 1
+        stack.append(root)
+        on_stack[root] = True
+        # Explicit call stack: node and its children still to visit
+        calls = [(root, iter(children(root)))]
+        while calls:
+            node, to_visit = calls[-1]
+            for other_node in to_visit:
+                if indexes[other_node] == -1:
+                    indexes[other_node] = low_link[other_node] = index
+                    index += 1
+                    stack.append(other_node)
+                    on_stack[other_node] = True
+                    calls.append((other_node, iter(children(other_node))))
+                    break
+                if on_stack[other_node]:
+                    low_link[node] = min(low_link[node], indexes[other_node])
+            else:
+                calls.pop()
+                if calls:
+                    parent = calls[-1][0]
+                    low_link[parent] = min(low_link[parent], low_link[node])
+                if low_link[node] == indexes[node]:
+                    other_node = -1
+                    while other_node != node:
+                        other_node = stack.pop()
+                        on_stack[other_node] = False
+                        scc[other_node] = scc_index
+                    scc_index += 1
+    assert roots is not None or -1 not in scc
+    return scc
+
+
+def component_members(scc: Sequence[int]) -> List[List[int]]:
+    """Nodes of each component, in increasing order"""
+    members = [[] for _ in range(max(scc) + 1 if scc else 0)
+               ]  # type: List[List[int]]
+    for node, component in enumerate(scc):
+        members[component].append(node)
+    return members
+
+
+def component_distances(children: List[List[Tuple[int, int]]], source: int,
+                        targets: Dict[int, int]) -> List[int]:
+    """Shortest distances from source in a component, by position in it.
+    Only exact for targets, and only up to their given maximum distance:
+    the search stops after that. Not yet reached nodes are at distance -1.
+    """
+    distances = [-1 for _ in range(len(children))]
+    distances[source] = 0
+    limit = max(targets.values())
+    remaining = len(targets)
+    # Costs are 0 or 1, so with free edges put in front of the queue, nodes
+    # are popped in increasing distance
+    to_visit = deque([(0, source)])
+    while to_visit and remaining:
+        current_distance, current = to_visit.popleft()
+        if current_distance > limit:
+            break
+        if current_distance != distances[current]:
+            continue  # Already popped with a shorter distance
+        if current in targets:
+            remaining -= 1
+        for child, cost in children[current]:
+            new_dist = current_distance + cost
+            if distances[child] == -1 or distances[child] > new_dist:
+                distances[child] = new_dist
+                if cost == 0:
+                    to_visit.appendleft((new_dist, child))
+                else:
+                    to_visit.append((new_dist, child))
+    return distances
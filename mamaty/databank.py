@@ -17,16 +17,52 @@
 """Utils to load and use the game data bank"""
 
 import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
-from typing import Dict, Iterator, List, Tuple, Type, TypeVar
+from functools import partial
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Sequence,
+                    Tuple, Type, TypeVar)
 
+from mamaty.profiling import NO_PROFILER, Profiler
+
+_T = TypeVar('_T')
+_T_ITEM = TypeVar('_T_ITEM')
 _T_OBJECT = TypeVar('_T_OBJECT', bound='Object')
 _T_TRANSITION = TypeVar('_T_TRANSITION', bound='Transition')
 
+# Load objects and transitions of a root folder, like load_databank, given
+# a number of workers and a profiler
+DatabankLoader = Callable[[str, int, Profiler], Tuple[Dict[int, 'Object'],
+                                                      List['Transition']]]
+
+
+def _map_chunks(function: Callable[[Sequence[_T_ITEM]], List[_T]],
+                items: Sequence[_T_ITEM], workers: int) -> Iterator[_T]:
+    """Apply function on slices of items, in a process pool if workers > 1.
+    Results are given in the same order as if done in a single call.
+    """
+    if workers <= 1 or len(items) < 2:
+        yield from function(items)
+        return
+    # A few chunks per worker to balance uneven files
+    size = max(1, -(-len(items) // (workers * 4)))
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+    with ProcessPoolExecutor(workers) as executor:
+        for result in executor.map(function, chunks):
+            yield from result
+
+
+_NO_CONTENT = ()  # type: Tuple[Any, ...]
+
 
 class Object:
     """An in game object"""
 
+    __slots__ = ('identifier', 'name', 'is_natural', 'is_category',
+                 'transitions_from', 'transitions_to', 'transitions_through',
+                 'category_contains')
+
     def __init__(self: _T_OBJECT, identifier: int, name: str,
                  natural: bool) -> None:
         self.identifier = identifier
@@ -36,7 +72,8 @@ class Object:
         self.transitions_from = []  # type: List[Transition]
         self.transitions_to = []  # type: List[Transition]
         self.transitions_through = []  # type: List[Transition]
-        self.category_contains = []  # type: List[_T_OBJECT]
+        # Shared by all objects until set_category is called
+        self.category_contains = _NO_CONTENT  # type: Sequence[_T_OBJECT]
 
     def __repr__(self: _T_OBJECT) -> str:
         return self.name
@@ -48,6 +85,11 @@ class Object:
         self.is_category = True
         self.category_contains = content
 
+    def unset_category(self: _T_OBJECT) -> None:
+        """Set this object as a simple object again"""
+        self.is_category = False
+        self.category_contains = _NO_CONTENT
+
     @classmethod
     def from_file(cls: Type[_T_OBJECT], filename: str) -> _T_OBJECT:
         """Parse an object file"""
@@ -68,8 +110,22 @@ class Object:
             return cls(object_id, name, natural)
 
     @classmethod
-    def parse_all(cls: Type[_T_OBJECT],
-                  object_folder: str) -> Dict[int, _T_OBJECT]:
+    def parse_range(cls: Type[_T_OBJECT], object_folder: str,
+                    identifiers: Sequence[int]) -> List[_T_OBJECT]:
+        """Parse existing objects among the given identifiers"""
+        objs = []  # type: List[_T_OBJECT]
+        for i in identifiers:
+            try:
+                obj = cls.from_file("{}/{}.txt".format(object_folder, i))
+                assert i == obj.identifier
+                objs.append(obj)
+            except (FileNotFoundError, ValueError):
+                continue
+        return objs
+
+    @classmethod
+    def parse_all(cls: Type[_T_OBJECT], object_folder: str,
+                  workers: int = 1) -> Dict[int, _T_OBJECT]:
         """Parse all objects from objects folder"""
         next_object = 0
         try:
@@ -78,18 +134,37 @@ class Object:
         except (FileNotFoundError, ValueError):
             return {}
         dic = {}  # type: Dict[int, _T_OBJECT]
-        for i in range(next_object):
-            try:
-                obj = cls.from_file("{}/{}.txt".format(object_folder, i))
-                assert i == obj.identifier
-                dic[i] = obj
-            except (FileNotFoundError, ValueError):
-                continue
+        for obj in _map_chunks(
+                partial(cls.parse_range, object_folder), range(next_object),
+                workers):
+            dic[obj.identifier] = obj
         assert 0 not in dic
         dic[0] = cls(0, "Bare Hands", True)
         return dic
 
 
+class LazyObject(Object):
+    """Object whose file is only read when its name is needed"""
+
+    __slots__ = ('object_folder', )
+
+    def __init__(self, identifier: int, object_folder: str,
+                 natural: bool) -> None:
+        super().__init__(identifier, '', natural)
+        del self.name
+        self.object_folder = object_folder
+
+    def __getattr__(self, attribute: str) -> Any:
+        # Only called for attributes not set, so for the name once
+        if attribute != 'name':
+            raise AttributeError(attribute)
+        with open("{}/{}.txt".format(self.object_folder, self.identifier),
+                  'r') as in_file:
+            in_file.readline()
+            self.name = in_file.readline().strip()
+        return self.name
+
+
 class TransitionType(Enum):
     """Classification of transitions"""
     NATURAL = 0
@@ -99,9 +174,28 @@ class TransitionType(Enum):
     CRAFT = 4
 
 
+def transition_type(actor: int, target: int) -> TransitionType:
+    """Classification of a transition, given its actor and target"""
+    if actor == -1:
+        return TransitionType.NATURAL
+    if actor == 0:
+        return TransitionType.BARE_HANDS
+    if actor == -2:
+        return TransitionType.INTERACT
+    if target == -1:
+        return TransitionType.DROP
+    return TransitionType.CRAFT
+
+
 class Transition:
     """A recipe: transition from objects to others"""
 
+    __slots__ = ('actor', 'target', 'new_actor', 'new_target',
+                 'auto_decay_seconds', 'last_use_actor', 'last_use_target',
+                 'move', 'desired_move_dist', 'reverse_use_actor_flag',
+                 'reverse_use_target_flag', 'actor_min_use_fraction',
+                 'target_min_use_fraction', 'type')
+
     def __init__(self: _T_TRANSITION,
                  actor: int,
                  target: int,
@@ -141,19 +235,11 @@ class Transition:
         self.actor_min_use_fraction = actor_min_use_fraction
         self.target_min_use_fraction = target_min_use_fraction
 
-        self.type = TransitionType.CRAFT
-        if actor == -1:
-            self.type = TransitionType.NATURAL
-            assert target > 0
-        elif actor == 0:
-            self.type = TransitionType.BARE_HANDS
-            assert target > 0
-        elif actor == -2:
-            self.type = TransitionType.INTERACT
-            assert target > 0
-        elif target == -1:
-            self.type = TransitionType.DROP
+        self.type = transition_type(actor, target)
+        if self.type == TransitionType.DROP:
             assert actor > 0
+        elif self.type != TransitionType.CRAFT:
+            assert target > 0
         assert (self.type == TransitionType.NATURAL) == (auto_decay_seconds !=
                                                          0)
 
@@ -169,6 +255,30 @@ class Transition:
             if object_to not in self.get_input_objects():
                 objects[object_to].transitions_to.append(self)
 
+    def remove_from_objects(self: _T_TRANSITION,
+                            objects: Dict[int, _T_OBJECT]) -> None:
+        """Undo add_to_objects"""
+        for identifier in set(self.get_input_objects()) | set(
+                self.get_output_objects()):
+            obj = objects.get(identifier)
+            if obj is None:
+                continue
+            for transitions in (obj.transitions_from, obj.transitions_to,
+                                obj.transitions_through):
+                transitions[:] = [i for i in transitions if i is not self]
+
+    def key(self: _T_TRANSITION) -> Tuple[int, int, bool, bool]:
+        """Identify the transition, as its file name does"""
+        return (self.actor, self.target, self.last_use_actor,
+                self.last_use_target)
+
+    @staticmethod
+    def key_from_filename(filename: str) -> Tuple[int, int, bool, bool]:
+        """Identify the transition described in a file"""
+        args = filename[:-4].split('_')
+        return (int(args[0]), int(args[1]), 'LA' in args, 'LT' in args
+                or 'L' in args)
+
     def get_input_objects(self: _T_TRANSITION) -> Iterator[int]:
         """Give identifier of input objects if there are real objects"""
         if self.actor > 0:
@@ -187,60 +297,289 @@ class Transition:
     def from_file(cls: Type[_T_TRANSITION], folder: str,
                   filename: str) -> _T_TRANSITION:
         """Parse a transition file"""
-        args = filename[:-4].split('_')
-        actor = int(args[0])
-        target = int(args[1])
-        last_use_actor = 'LA' in args
-        last_use_target = 'LT' in args or 'L' in args
-        line = ''
-        with open(folder + "/" + filename, 'r') as in_file:
-            line = in_file.readline().strip()
-        args = line.split()
-        new_actor = int(args[0])
-        new_target = int(args[1])
-        auto_decay_seconds = int(args[2]) if len(args) > 2 else 0
-        actor_min_use_fraction = float(args[3]) if len(args) > 3 else 0.
-        target_min_use_fraction = float(args[4]) if len(args) > 4 else 0.
-        reverse_use_actor_flag = int(args[5]) if len(args) > 5 else 0
-        reverse_use_target_flag = int(args[6]) if len(args) > 6 else 0
-        move = int(args[7]) if len(args) > 7 else 0
-        desired_move_dist = int(args[8]) if len(args) > 8 else 0
-        return cls(actor, target, new_actor, new_target, last_use_actor,
-                   last_use_target, auto_decay_seconds, actor_min_use_fraction,
-                   target_min_use_fraction, reverse_use_actor_flag,
-                   reverse_use_target_flag, move, desired_move_dist)
+        columns = _read_transition_files(folder, [filename])[0]
+        return cls(*next(_transition_rows(columns)))
 
     @classmethod
     def parse_all(cls: Type[_T_TRANSITION],
-                  transition_folder: str) -> Iterator[_T_TRANSITION]:
+                  transition_folder: str,
+                  workers: int = 1) -> Iterator[_T_TRANSITION]:
         """Parse all transitions from transitions folder"""
-        for filename in os.listdir(transition_folder):
-            if filename.endswith(".txt"):
-                yield cls.from_file(transition_folder, filename)
+        columns = read_transition_columns(transition_folder, workers)
+        yield from (cls(*row) for row in _transition_rows(columns))
+
+
+# Columns of transitions, in the order of Transition arguments
+TRANSITION_COLUMNS = ('actor', 'target', 'new_actor', 'new_target',
+                      'last_use_actor', 'last_use_target',
+                      'auto_decay_seconds', 'actor_min_use_fraction',
+                      'target_min_use_fraction', 'reverse_use_actor_flag',
+                      'reverse_use_target_flag', 'move', 'desired_move_dist')
+
+# Columns given by the first line of a transition file, and their defaults
+_LINE_COLUMNS = (
+    ('new_actor', 0),
+    ('new_target', 0),
+    ('auto_decay_seconds', 0),
+    ('actor_min_use_fraction', 0.),
+    ('target_min_use_fraction', 0.),
+    ('reverse_use_actor_flag', 0),
+    ('reverse_use_target_flag', 0),
+    ('move', 0),
+    ('desired_move_dist', 0),
+)
+
+
+def _empty_transition_columns() -> Dict[str, Any]:
+    columns = {}  # type: Dict[str, Any]
+    for name in TRANSITION_COLUMNS:
+        if name.endswith('fraction'):
+            columns[name] = array('d')
+        elif name.startswith('last_use'):
+            # Booleans given by file names
+            columns[name] = bytearray()
+        else:
+            columns[name] = array('l')
+    return columns
+
+
+def _read_first_line(path: str) -> bytes:
+    """First line of a file, with raw system calls"""
+    descriptor = os.open(path, os.O_RDONLY)
+    try:
+        data = os.read(descriptor, 256)
+        while b'\n' not in data:
+            chunk = os.read(descriptor, 4096)
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        os.close(descriptor)
+    return data.split(b'\n', 1)[0]
+
+
+def _read_transition_files(folder: str,
+                           filenames: Sequence[str]) -> List[Dict[str, Any]]:
+    """Columns of the given transition files, in a single element list"""
+    columns = _empty_transition_columns()
+    actors, targets = columns['actor'], columns['target']
+    last_use_actors = columns['last_use_actor']
+    last_use_targets = columns['last_use_target']
+    values = [(columns[name], type(default), default)
+              for name, default in _LINE_COLUMNS]
+    for filename in filenames:
+        actor, target, last_use_actor, last_use_target = \
+            Transition.key_from_filename(filename)
+        actors.append(actor)
+        targets.append(target)
+        last_use_actors.append(last_use_actor)
+        last_use_targets.append(last_use_target)
+        args = _read_first_line(folder + "/" + filename).split()
+        for i, (column, convert, default) in enumerate(values):
+            column.append(convert(args[i]) if i < len(args) else default)
+    return [columns]
+
+
+def read_transition_columns(transition_folder: str,
+                            workers: int = 1) -> Dict[str, Any]:
+    """Parse all transitions of the folder into columns, named as in
+    TRANSITION_COLUMNS, listing the folder once.
+    """
+    filenames = [
+        entry.name for entry in os.scandir(transition_folder)
+        if entry.name.endswith(".txt")
+    ]
+    columns = _empty_transition_columns()
+    for chunk in _map_chunks(
+            partial(_read_transition_files, transition_folder), filenames,
+            workers):
+        for name in TRANSITION_COLUMNS:
+            columns[name].extend(chunk[name])
+    return columns
+
+
+def _transition_rows(columns: Dict[str, Any]) -> Iterator[Tuple[Any, ...]]:
+    """Transition arguments of each row of columns"""
+    # "or 0." shares a single float object for the usual zero value
+    return zip(
+        columns['actor'], columns['target'], columns['new_actor'],
+        columns['new_target'], map(bool, columns['last_use_actor']),
+        map(bool, columns['last_use_target']), columns['auto_decay_seconds'],
+        (i or 0. for i in columns['actor_min_use_fraction']),
+        (i or 0. for i in columns['target_min_use_fraction']),
+        columns['reverse_use_actor_flag'], columns['reverse_use_target_flag'],
+        columns['move'], columns['desired_move_dist'])
+
+
+def transitions_from_columns(columns: Dict[str, Any]) -> List[Transition]:
+    """Transitions of columns named as in TRANSITION_COLUMNS"""
+    return [Transition(*row) for row in _transition_rows(columns)]
+
+
+def _parse_category(filename: str, objects: Dict[int, _T_OBJECT]) -> None:
+    """Parse a category file"""
+    with open(filename, 'r') as in_file:
+        parent_id = int(in_file.readline().strip().split("=")[1])
+        num_objs = int(in_file.readline().strip().split("=")[1])
+        objects[parent_id].set_category([
+            objects[int(in_file.readline().strip())] for _ in range(num_objs)
+        ])
 
 
-def _parse_all_categories(categories_folder: str,
-                          objects: Dict[int, _T_OBJECT]) -> None:
+def parse_all_categories(categories_folder: str,
+                         objects: Dict[int, _T_OBJECT]) -> None:
     """Parse all categories from categories folder"""
     for filename in os.listdir(categories_folder):
         if filename.endswith(".txt"):
-            with open(categories_folder + "/" + filename, 'r') as in_file:
-                parent_id = int(in_file.readline().strip().split("=")[1])
-                num_objs = int(in_file.readline().strip().split("=")[1])
-                objects[parent_id].set_category([
-                    objects[int(in_file.readline().strip())]
-                    for _ in range(num_objs)
-                ])
+            _parse_category(categories_folder + "/" + filename, objects)
 
 
-def load_databank(
-        root_folder: str) -> Tuple[Dict[int, Object], List[Transition]]:
+def load_databank(root_folder: str,
+                  workers: int = 1,
+                  profiler: Profiler = NO_PROFILER
+                  ) -> Tuple[Dict[int, Object], List[Transition]]:
     """Read all objects and load them with transitions and categories.
-    Returns both the object list and the transition list
+    Returns both the object list and the transition list.
+    With several workers, files are parsed in a pool of processes.
     """
-    objects = Object.parse_all(root_folder + '/objects')
-    transitions = list(Transition.parse_all(root_folder + '/transitions'))
-    for transition in transitions:
-        transition.add_to_objects(objects)
-    _parse_all_categories(root_folder + '/categories', objects)
-    return objects, transitions
+    with profiler.phase('objects') as phase:
+        objects = Object.parse_all(root_folder + '/objects', workers)
+        phase.counts['objects'] = len(objects)
+    return objects, link_databank(root_folder, objects, workers, profiler)
+
+
+def link_databank(root_folder: str,
+                  objects: Dict[int, Object],
+                  workers: int = 1,
+                  profiler: Profiler = NO_PROFILER) -> List[Transition]:
+    """Load transitions and categories of parsed objects"""
+    with profiler.phase('transitions') as phase:
+        transitions = transitions_from_columns(
+            read_transition_columns(root_folder + '/transitions', workers))
+        for transition in transitions:
+            transition.add_to_objects(objects)
+        phase.counts['transitions'] = len(transitions)
+    with profiler.phase('categories'):
+        parse_all_categories(root_folder + '/categories', objects)
+    return transitions
+
+
+class DatabankUpdate:
+    """What changed in the databank after an incremental update"""
+
+    def __init__(self) -> None:
+        self.added_objects = []  # type: List[Object]
+        self.updated_objects = []  # type: List[Object]
+        self.removed_objects = []  # type: List[Object]
+        self.updated_categories = []  # type: List[Object]
+        self.added_transitions = []  # type: List[Transition]
+        self.removed_transitions = []  # type: List[Transition]
+
+    def __bool__(self) -> bool:
+        return any((self.added_objects, self.updated_objects,
+                    self.removed_objects, self.updated_categories,
+                    self.added_transitions, self.removed_transitions))
+
+
+def _update_objects(root_folder: str, identifiers: List[int],
+                    objects: Dict[int, Object],
+                    update: DatabankUpdate) -> None:
+    """Parse again the given objects, keeping existing instances.
+    An object whose file does not parse is kept as it was.
+    """
+    for identifier in identifiers:
+        try:
+            parsed = Object.from_file("{}/objects/{}.txt".format(
+                root_folder, identifier))
+        except FileNotFoundError:
+            if identifier in objects:
+                update.removed_objects.append(objects[identifier])
+            continue
+        except ValueError:
+            continue
+        assert identifier == parsed.identifier
+        if identifier not in objects:
+            # Keep Bare Hands last, like a full parse does
+            bare_hands = objects.pop(0)
+            objects[identifier] = parsed
+            objects[0] = bare_hands
+            update.added_objects.append(parsed)
+        else:
+            obj = objects[identifier]
+            obj.name = parsed.name
+            obj.is_natural = parsed.is_natural
+            update.updated_objects.append(obj)
+
+
+def _update_transitions(
+        root_folder: str, filenames: List[str], objects: Dict[int, Object],
+        transitions: List[Transition], update: DatabankUpdate) -> None:
+    """Parse again the given transition files. A transition whose file does
+    not parse is kept as it was.
+    """
+    by_key = {t.key(): t for t in transitions}
+    for filename in filenames:
+        try:
+            # A single transition, or none if the file was deleted
+            new = transitions_from_columns(
+                _read_transition_files(root_folder + '/transitions',
+                                       [filename])[0])
+        except FileNotFoundError:
+            new = []
+        except ValueError:
+            continue
+        old = by_key.pop(Transition.key_from_filename(filename), None)
+        if old is not None:
+            old.remove_from_objects(objects)
+            update.removed_transitions.append(old)
+        for transition in new:
+            by_key[transition.key()] = transition
+            transition.add_to_objects(objects)
+            transitions.append(transition)
+            update.added_transitions.append(transition)
+    removed = set(id(t) for t in update.removed_transitions)
+    transitions[:] = [t for t in transitions if id(t) not in removed]
+
+
+def update_databank(root_folder: str, objects: Dict[int, Object],
+                    transitions: List[Transition],
+                    changed_files: Iterable[str]) -> DatabankUpdate:
+    """Patch a loaded databank in place after some data files changed.
+    Files are given relatively to the root folder (e.g. "objects/12.txt"),
+    and can have been added, modified or deleted.
+    """
+    update = DatabankUpdate()
+    object_ids = []  # type: List[int]
+    transition_files = []  # type: List[str]
+    category_files = []  # type: List[str]
+    for path in changed_files:
+        folder, filename = path.split('/')
+        if not filename.endswith('.txt'):
+            continue
+        if folder == 'objects' and filename != 'nextObjectNumber.txt':
+            object_ids.append(int(filename[:-4]))
+        elif folder == 'transitions':
+            transition_files.append(filename)
+        elif folder == 'categories':
+            category_files.append(filename)
+
+    _update_objects(root_folder, object_ids, objects, update)
+    _update_transitions(root_folder, transition_files, objects, transitions,
+                        update)
+
+    removed_objects = set(id(obj) for obj in update.removed_objects)
+    for obj in update.removed_objects:
+        del objects[obj.identifier]
+    changed_categories = set(int(f[:-4]) for f in category_files)
+    for obj in objects.values():
+        if any(id(i) in removed_objects for i in obj.category_contains):
+            changed_categories.add(obj.identifier)
+    for identifier in changed_categories:
+        if identifier not in objects:
+            continue
+        objects[identifier].unset_category()
+        filename = "{}/categories/{}.txt".format(root_folder, identifier)
+        if os.path.exists(filename):
+            _parse_category(filename, objects)
+        update.updated_categories.append(objects[identifier])
+    return update
@@ -0,0 +1,238 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Objects reachable from an inventory, following transitions forward"""
+
+import threading
+from typing import AbstractSet, Dict, Iterable, Iterator, List, Optional
+from typing import Sequence, Tuple
+
+from mamaty.graph import BaseGraph, GraphNode
+
+# Complexity of nodes that cannot be reached
+UNREACHABLE = GraphNode.DEFAULT_COMPLEXITY
+
+
+class ForwardReachability:
+    """Complexity of every node given held objects, computed like node
+    complexities: an object takes its cheapest way, and a transition needs
+    all of its inputs, so costs the most complex one.
+    The baseline, where only natural objects are held, is computed once.
+    Holding more objects can only lower complexities, so an inventory only
+    propagates from its objects, through the nodes it makes cheaper.
+    """
+
+    def __init__(self, graph: BaseGraph) -> None:
+        self.graph = graph
+        self.version = -1
+        # Children, and cost of the edge to them, of each node
+        self.children = []  # type: List[List[Tuple[int, int]]]
+        # Both inputs, and cost of the edge from them, of each transition
+        # node with an actor and a target, None for other nodes
+        self.inputs = []  # type: List[Optional[Tuple[int, int, int, int]]]
+        self.baseline = []  # type: Sequence[int]
+        # Copy of the baseline, modified only while propagating
+        self._complexity = []  # type: List[int]
+        # Propagations using the copy of the baseline are done one at a time
+        self._lock = threading.Lock()
+        self._build()
+
+    def _build(self) -> None:
+        graph = self.graph
+        self.version = graph.version
+        node_count = graph.node_count()
+        self.children = [[] for _ in range(node_count)]
+        inputs = [[] for _ in range(node_count)
+                  ]  # type: List[List[Tuple[int, int]]]
+        for edge in range(graph.edge_count()):
+            cost = graph.edge_cost(edge)
+            from_node, to_node = graph.edge_ends(edge)
+            self.children[from_node].append((to_node, cost))
+            inputs[to_node].append((from_node, cost))
+        # Only needed for transitions with two inputs: otherwise the
+        # transition is as complex as its input, plus the edge cost
+        self.inputs = [
+            inputs[node][0] + inputs[node][1]
+            if len(inputs[node]) == 2 and graph.is_transition(node) else None
+            for node in range(node_count)
+        ]
+
+        natural = [
+            node for node in graph.obj_to_node.values()
+            if graph.is_natural(node)
+        ]
+        # Propagated from nothing reachable
+        self.baseline = [UNREACHABLE for _ in range(node_count)]
+        self._complexity = list(self.baseline)
+        changes = self._lower({}, natural)
+        self.baseline = [
+            changes.get(node, UNREACHABLE) for node in range(node_count)
+        ]
+        self._complexity = list(self.baseline)
+
+    def _lower(self, changes: Dict[int, int],
+               held: Iterable[int]) -> Dict[int, int]:
+        """Changes to the baseline complexities when held nodes cost nothing,
+        on top of the given changes. Only changed nodes are looked at.
+        """
+        with self._lock:
+            return self._lower_locked(changes, held)
+
+    def _lower_locked(self, changes: Dict[int, int],
+                      held: Iterable[int]) -> Dict[int, int]:
+        """Same as _lower, changes being written in the copy of the baseline
+        while propagating, and restored afterwards
+        """
+        complexity = self._complexity
+        for node, value in changes.items():
+            complexity[node] = value
+        changes = dict(changes)
+        try:
+            # Nodes by complexity: a node is finalized when its bucket is
+            # reached, children of a node being at least as complex as it
+            buckets = [[]]  # type: List[List[int]]
+            for node in held:
+                if complexity[node] > 0:
+                    complexity[node] = changes[node] = 0
+                    buckets[0].append(node)
+            value = 0
+            while value < len(buckets):
+                self._lower_bucket(value, changes, buckets)
+                value += 1
+        finally:
+            baseline = self.baseline
+            for node in changes:
+                complexity[node] = baseline[node]
+        return changes
+
+    def _lower_bucket(self, value: int, changes: Dict[int, int],
+                      buckets: List[List[int]]) -> None:
+        """Finalize nodes of the given complexity, lowering their children
+        and adding them to the buckets of their new complexity
+        """
+        complexity = self._complexity
+        children = self.children
+        inputs = self.inputs
+        for node in buckets[value]:
+            if complexity[node] != value:
+                continue  # Lowered again, so already done
+            for child, cost in children[node]:
+                child_inputs = inputs[child]
+                if child_inputs is None:
+                    new_value = value + cost
+                else:
+                    actor, actor_cost, target, target_cost = child_inputs
+                    new_value = max(value, complexity[actor] + actor_cost,
+                                    complexity[target] + target_cost)
+                if new_value < complexity[child]:
+                    complexity[child] = changes[child] = new_value
+                    while len(buckets) <= new_value:
+                        buckets.append([])
+                    buckets[new_value].append(child)
+
+    def _nodes_of(self, objects: Iterable[int]) -> List[int]:
+        """Nodes of objects, bare hands being always held"""
+        return [self.graph.obj_to_node[i] for i in objects if i != 0]
+
+    def from_inventory(self, objects: Iterable[int]) -> 'Reachable':
+        """Nodes reachable when holding objects, besides natural ones"""
+        if self.version != self.graph.version:
+            self._build()
+        reachable = Reachable(self)
+        reachable.add(objects)
+        return reachable
+
+    def from_inventories(self, inventories: Iterable[AbstractSet[int]]
+                         ) -> Iterator['Reachable']:
+        """Nodes reachable from each inventory. When an inventory holds all
+        objects of the previous one, it starts from its result.
+        """
+        previous = None  # type: Optional[Reachable]
+        for inventory in inventories:
+            if previous is not None and previous.is_current() and \
+                    previous.inventory <= inventory:
+                reachable = previous.copy()
+                reachable.add(inventory - previous.inventory)
+            else:
+                reachable = self.from_inventory(inventory)
+            yield reachable
+            previous = reachable
+
+
+class Reachable:  # pylint: disable=protected-access
+    """Complexities given held objects, stored as the changes to the
+    baseline of the forward reachability they come from
+    """
+
+    def __init__(self, forward: ForwardReachability) -> None:
+        self.forward = forward
+        self.version = forward.version
+        self.inventory = frozenset()  # type: AbstractSet[int]
+        # Complexity of the nodes made cheaper by the inventory
+        self.changes = {}  # type: Dict[int, int]
+
+    def is_current(self) -> bool:
+        """Whether the graph is unchanged since computed"""
+        return self.version == self.forward.graph.version
+
+    def copy(self) -> 'Reachable':
+        """Independent copy, to be extended with other objects"""
+        reachable = Reachable(self.forward)
+        reachable.version = self.version
+        reachable.inventory = self.inventory
+        # Changes are replaced, not modified, when objects are added
+        reachable.changes = self.changes
+        return reachable
+
+    def add(self, objects: Iterable[int]) -> None:
+        """Also hold objects, only propagating from them"""
+        if not self.is_current():
+            raise ValueError("The graph was modified since computed")
+        objects = frozenset(objects) - self.inventory
+        if not objects:
+            return
+        self.changes = self.forward._lower(self.changes,
+                                           self.forward._nodes_of(objects))
+        self.inventory = self.inventory | objects
+
+    def complexity(self, obj: int) -> int:
+        """Complexity of object, UNREACHABLE if it cannot be made"""
+        node = self.forward.graph.obj_to_node[obj]
+        return self.changes.get(node, self.forward.baseline[node])
+
+    def _objects(self, nodes: Iterable[int]) -> Iterator[Tuple[int, int]]:
+        graph = self.forward.graph
+        baseline = self.forward.baseline
+        for node in nodes:
+            value = self.changes.get(node, baseline[node])
+            if value != UNREACHABLE and not graph.is_transition(node):
+                yield graph.object_id(node), value
+
+    def improved(self) -> Dict[int, int]:
+        """Complexity of the objects made cheaper by the inventory,
+        including the ones only reachable with it
+        """
+        return dict(self._objects(self.changes))
+
+    def newly_reachable(self) -> List[int]:
+        """Objects only reachable with the inventory"""
+        baseline = self.forward.baseline
+        return sorted(identifier for identifier, _ in self._objects(
+            node for node in self.changes if baseline[node] == UNREACHABLE))
+
+    def reachable(self) -> Dict[int, int]:
+        """Complexity of every reachable object"""
+        return dict(self._objects(self.forward.graph.obj_to_node.values()))
@@ -16,11 +16,46 @@
 # along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
 """Graph representing transitions between objects"""
 
+import logging
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Dict, List, Iterator, Optional, Set, Tuple
+from typing import AbstractSet, Dict, Iterable, Iterator, List
+from typing import Mapping, Optional, Sequence, Set, TextIO, Tuple
 
-from mamaty.databank import Object, Transition, TransitionType, load_databank
+from mamaty.components import component_distances, component_members
+from mamaty.components import strongly_connected_components
+from mamaty.databank import DatabankLoader, DatabankUpdate, Object
+from mamaty.databank import Transition, TransitionType, load_databank
+from mamaty.profiling import NO_PROFILER, Profiler
+
+_LOGGER = logging.getLogger(__name__)
+
+# Unreachable objects logged one by one, the others being only counted
+MAX_UNREACHABLE_WARNINGS = 10
+
+
+def object_graphviz_decl(identifier: int, name: str, complexity: int) -> str:
+    """How to declare an object node to graphviz"""
+    color = ",color=green" if complexity == 0 else ""
+    return '{} [label="{}"{}]'.format(identifier, name, color)
+
+
+def transition_graphviz_decl(name: str) -> str:
+    """How to declare a transition node of the given name to graphviz"""
+    return '{} [label="+"{}]'.format(
+        name, ",shape=record,width=.05,height=.05,fontsize=6")
+
+
+def _format_object(obj: int) -> str:
+    return str(obj) if obj >= 0 else "m{}".format(-obj)
+
+
+def transition_graphviz_name(actor: int, target: int, last_use_actor: bool,
+                             last_use_target: bool) -> str:
+    """How to use a transition node in graphviz"""
+    return 't{}p{}{}{}'.format(
+        _format_object(actor), _format_object(target), "LA"
+        if last_use_actor else "", "LT" if last_use_target else "")
 
 
 class GraphNode(ABC):
@@ -31,11 +66,6 @@ class GraphNode(ABC):
     def __init__(self) -> None:
         self.complexity = self.DEFAULT_COMPLEXITY
 
-    @abstractmethod
-    def update_complexity(self, incoming_complexity: int) -> bool:
-        """Update the complexity, return True if should propagate"""
-        pass
-
     @abstractmethod
     def graphviz_decl(self) -> str:
         """How to declare the node to graphviz"""
@@ -57,17 +87,9 @@ class NodeObject(GraphNode):
             self.complexity = 0
         assert self.obj.identifier < self.DEFAULT_COMPLEXITY
 
-    def update_complexity(self, incoming_complexity: int) -> bool:
-        assert incoming_complexity < self.DEFAULT_COMPLEXITY
-        if self.complexity > incoming_complexity:
-            self.complexity = incoming_complexity
-            return True
-        return False
-
     def graphviz_decl(self) -> str:
-        color = ",color=green" if self.complexity == 0 else ""
-        return '{} [label="{}"{}]'.format(self.obj.identifier, self.obj.name,
-                                          color)
+        return object_graphviz_decl(self.obj.identifier, self.obj.name,
+                                    self.complexity)
 
     def graphviz_name(self) -> str:
         return '{}'.format(self.obj.identifier)
@@ -82,31 +104,16 @@ class NodeTransition(GraphNode):
     def __init__(self, transition: Transition) -> None:
         super().__init__()
         self.transition = transition
+        # Most complex input so far, -1 before any
         self.complexity = -1
 
-    def update_complexity(self, incoming_complexity: int) -> bool:
-        assert incoming_complexity < self.DEFAULT_COMPLEXITY
-        if self.complexity == -1:
-            self.complexity = incoming_complexity
-            return len(list(self.transition.get_input_objects())) == 1
-        self.complexity = max(self.complexity, incoming_complexity)
-        return True  # Now the distance is computed
-
     def graphviz_decl(self) -> str:
-        return '{} [label="+"{}]'.format(
-            self.graphviz_name(),
-            ",shape=record,width=.05,height=.05,fontsize=6")
-
-    @staticmethod
-    def _format_object(obj: int) -> str:
-        return str(obj) if obj >= 0 else "m{}".format(-obj)
+        return transition_graphviz_decl(self.graphviz_name())
 
     def graphviz_name(self) -> str:
-        return 't{}p{}{}{}'.format(
-            self._format_object(self.transition.actor),
-            self._format_object(self.transition.target), "LA"
-            if self.transition.last_use_actor else "", "LT"
-            if self.transition.last_use_target else "")
+        return transition_graphviz_name(
+            self.transition.actor, self.transition.target,
+            self.transition.last_use_actor, self.transition.last_use_target)
 
 
 def _get_node_through_proxy(node: int, proxy: Dict[int, int]) -> int:
@@ -128,6 +135,49 @@ class EdgeType(Enum):
     OTHER = 8
 
 
+_EDGE_COLORS = {
+    EdgeType.NATURAL: 'green',
+    EdgeType.BARE_HANDS: 'blue',
+    EdgeType.INTERACT: 'purple',
+    EdgeType.DROP: 'brown',
+    EdgeType.CONSUME: 'red',
+    EdgeType.TOOL: 'black',
+    EdgeType.TRANSITION: 'grey',
+    EdgeType.CATEGORY: 'yellow',
+}
+
+
+def category_cost(category: EdgeType) -> int:
+    """Cost in the graph of an edge of the given category"""
+    if category in (EdgeType.NATURAL, EdgeType.TRANSITION):
+        return 0
+    return 1
+
+
+def format_time(seconds: int) -> str:
+    """Format a transition time into a readable string"""
+    if seconds == 0:
+        return ""
+    if seconds < 0:
+        return "{} epoch".format(-seconds)
+    if seconds % 60 == 0:
+        return "{} min".format(seconds // 60)
+    return "{} s".format(seconds)
+
+
+def edge_graphviz(from_name: str, to_name: str, category: EdgeType,
+                  seconds: int) -> str:
+    """Graphviz representation of an edge between named nodes, seconds
+    being the time of its transition
+    """
+    edge = '{} -> {} [label="{}"'.format(from_name, to_name,
+                                         format_time(seconds))
+    if category in _EDGE_COLORS:
+        edge += ',color="{}"'.format(_EDGE_COLORS[category])
+    edge += "]"
+    return edge
+
+
 class Edge():
     """Graph edge"""
 
@@ -139,54 +189,32 @@ class Edge():
         self.transition = transition
         self.looping = False
 
+    def seconds(self) -> int:
+        """Time of the transition, 0 if instant or without transition"""
+        if self.transition is None:
+            return 0
+        return self.transition.auto_decay_seconds
+
     def format_time(self) -> str:
         """Format a transition time into a readable string"""
-        if self.transition is None:
-            return ""
-        time = self.transition.auto_decay_seconds
-        if time == 0:
-            return ""
-        if time < 0:
-            return "{} epoch".format(-time)
-        if time % 60 == 0:
-            return "{} min".format(time // 60)
-        return "{} s".format(time)
+        return format_time(self.seconds())
 
     def graphviz(self, nodes: List[GraphNode],
                  proxy_nodes: Dict[int, int]) -> str:
         """Graphviz representation of the edge"""
-        edge = "{} -> {}".format(nodes[_get_node_through_proxy(
+        return edge_graphviz(nodes[_get_node_through_proxy(
             self.from_node,
             proxy_nodes)].graphviz_name(), nodes[_get_node_through_proxy(
-                self.to_node, proxy_nodes)].graphviz_name())
-        edge += ' [label="{}"'.format(self.format_time())
-        if self.category == EdgeType.NATURAL:
-            edge += ',color="green"'
-        elif self.category == EdgeType.BARE_HANDS:
-            edge += ',color="blue"'
-        elif self.category == EdgeType.INTERACT:
-            edge += ',color="purple"'
-        elif self.category == EdgeType.DROP:
-            edge += ',color="brown"'
-        elif self.category == EdgeType.CONSUME:
-            edge += ',color="red"'
-        elif self.category == EdgeType.TOOL:
-            edge += ',color="black"'
-        elif self.category == EdgeType.TRANSITION:
-            edge += ',color="grey"'
-        elif self.category == EdgeType.CATEGORY:
-            edge += ',color="yellow"'
-        edge += "]"
-        return edge
+                self.to_node, proxy_nodes)].graphviz_name(), self.category,
+                             self.seconds())
 
     def cost(self) -> int:
         """Return the cost of the edge in the graph"""
-        if self.category in (EdgeType.NATURAL, EdgeType.TRANSITION):
-            return 0
-        return 1
+        return category_cost(self.category)
 
 
-def _transition_type_to_edge_type(transition_type: TransitionType) -> EdgeType:
+def transition_edge_type(transition_type: TransitionType) -> EdgeType:
+    """Category of the edges from the inputs of a transition"""
     edge_type = EdgeType.OTHER
     if transition_type == TransitionType.NATURAL:
         edge_type = EdgeType.NATURAL
@@ -202,223 +230,739 @@ def _transition_type_to_edge_type(transition_type: TransitionType) -> EdgeType:
     return edge_type
 
 
-class Graph:
-    """Representation of a graph"""
+class BaseGraph(ABC):
+    """Nodes and edges, numbered from 0, and what is computed from them:
+    complexities, components and loops. Subgraphs and indexes only use
+    this interface, and computations are shared by its implementations.
+    """
 
-    def __init__(self, objects: Dict[int, Object],
-                 transitions: List[Transition]) -> None:
-        self._nodes = []  # type: List[GraphNode]
-        self._edges = []  # type: List[Edge]
-        self._incoming_edges = []  # type: List[List[int]]
-        self._out_edges = []  # type: List[List[int]]
-        self.obj_to_node = {}  # type: Dict[int, int]
+    def __init__(self) -> None:
+        self.obj_to_node = {}  # type: Mapping[int, int]
+        # Incremented each time the graph is modified
+        self.version = 0
+        # Identifiers of objects that cannot be made
+        self.unreachable = set()  # type: AbstractSet[int]
+        # Edges making loops, also marked as looping
+        self.looping_edges = frozenset()  # type: AbstractSet[int]
+        # Strongly connected component of each node, components being
+        # numbered in reverse topological order
+        self.scc = []  # type: Sequence[int]
+        # Nodes of each component
+        self.components = []  # type: Sequence[Sequence[int]]
 
-        self._create(objects, transitions)
-        self._finish_computation()
+    @abstractmethod
+    def node_count(self) -> int:
+        """Number of nodes"""
+        pass
 
-    def _create(self, objects: Dict[int, Object],
-                transitions: List[Transition]) -> None:
-        """Make graph for objects"""
-        # Create nodes:
-        for obj in objects.values():
-            if obj.identifier > 0:
-                self.obj_to_node[obj.identifier] = len(self._nodes)
-                self._nodes.append(NodeObject(obj))
-        # Add category edges
-        for obj in objects.values():
-            for contains in obj.category_contains:
-                self._edges.append(
-                    Edge(self.obj_to_node[contains.identifier],
-                         self.obj_to_node[obj.identifier], EdgeType.CATEGORY,
-                         None))
-        # Add transition edges
-        for transition in transitions:
-            node = len(self._nodes)
-            self._nodes.append(NodeTransition(transition))
-            outputs = list(transition.get_output_objects())
-            inputs = list(transition.get_input_objects())
-            for output in outputs:
-                if output not in inputs:
-                    self._edges.append(
-                        Edge(node, self.obj_to_node[output],
-                             EdgeType.TRANSITION, None))
-            for input_ in inputs:
-                edge_type = _transition_type_to_edge_type(transition.type)
-                if edge_type == EdgeType.CONSUME and input_ in outputs:
-                    edge_type = EdgeType.TOOL
-                self._edges.append(
-                    Edge(self.obj_to_node[input_], node, edge_type,
-                         transition))
+    @abstractmethod
+    def edge_count(self) -> int:
+        """Number of edges"""
+        pass
+
+    @abstractmethod
+    def get_out(self, node: int) -> Iterator[Tuple[int, int]]:
+        """Get children nodes and its edge, if still in the graph"""
+        pass
 
-    def _finish_computation(self) -> None:
-        """To be called after adding nodes and/or edges"""
+    @abstractmethod
+    def get_in(self, node: int) -> Iterator[Tuple[int, int]]:
+        """Get parent nodes and its edge"""
+        pass
 
-        # Update the incoming and out edges of each node
-        self._incoming_edges = [[] for _ in range(len(self._nodes))]
-        self._out_edges = [[] for _ in range(len(self._nodes))]
-        for i, edge in enumerate(self._edges):
-            self._out_edges[edge.from_node].append(i)
-            self._incoming_edges[edge.to_node].append(i)
+    @abstractmethod
+    def complexity(self, node: int) -> int:
+        """Complexity of the node"""
+        pass
 
-        self.__propagate_complexity()
+    @abstractmethod
+    def _set_complexity(self, node: int, complexity: int) -> None:
+        pass
+
+    @abstractmethod
+    def is_transition(self, node: int) -> bool:
+        """Whether the node is a transition, and not an object"""
+        pass
 
-        scc = self.__tarjan()
-        self.__remove_loops(scc)
+    @abstractmethod
+    def object_id(self, node: int) -> int:
+        """Identifier of the object of an object node"""
+        pass
 
-    def __propagate_complexity(self) -> None:
-        to_visit = set(
-            i for i, node in enumerate(self._nodes) if node.complexity == 0)
-        while to_visit:
-            current = to_visit.pop()
-            current_node = self._nodes[current]
-            distance = current_node.complexity
-            for edge_n in self._out_edges[current]:
-                edge = self._edges[edge_n]
-                if self._nodes[edge.to_node].update_complexity(
-                        distance + edge.cost()):
-                    to_visit.add(edge.to_node)
-        for i in self._nodes:
-            if i.complexity == i.DEFAULT_COMPLEXITY:
-                print("// WARNING: Object {} is unreachable".format(i))
-
-    def __tarjan(self) -> List[int]:
-        # Tarjan's strongly connected components algorithm
-        index = 0
-        indexes = [-1 for _ in range(len(self._nodes))]
-        low_link = [-1 for _ in range(len(self._nodes))]
-        on_stack = [False for _ in range(len(self._nodes))]
-        stack = []
-        scc = [-1 for _ in range(len(self._nodes))]
-        scc_index = 0
-
-        def __strongconnect(node: int) -> None:
-            nonlocal index
-            nonlocal indexes
-            nonlocal low_link
-            nonlocal on_stack
-            nonlocal stack
-            nonlocal scc
-            nonlocal scc_index
-            indexes[node] = index
-            low_link[node] = index
-            index += 1
-            stack.append(node)
-            on_stack[node] = True
-            for edge_n in self._out_edges[node]:
-                other_node = self._edges[edge_n].to_node
-                if indexes[other_node] == -1:
-                    __strongconnect(other_node)
-                    low_link[node] = min(low_link[node], low_link[other_node])
-                elif on_stack[other_node]:
-                    low_link[node] = min(low_link[node], indexes[other_node])
-            if low_link[node] == indexes[node]:
-                other_node = -1
-                while other_node != node:
-                    other_node = stack.pop()
-                    on_stack[other_node] = False
-                    scc[other_node] = scc_index
-                scc_index += 1
-
-        for node in range(len(self._nodes)):
-            if indexes[node] == -1:
-                __strongconnect(node)
-        assert -1 not in scc
-        return scc
-
-    def __remove_loops(self, scc: List[int]) -> None:
-        possible_from = []  # type: List[int]
-        possible_to = []  # type: List[int]
-        possible_edge = []  # type: List[int]
-        for i in range(len(self._nodes)):
-            in_edges = [self._edges[j] for j in self._incoming_edges[i]]
-            parents = ((e.from_node, e) for e in in_edges
-                       if scc[e.from_node] == scc[i])
+    @abstractmethod
+    def object_name(self, node: int) -> str:
+        """Name of the object of an object node"""
+        pass
+
+    @abstractmethod
+    def is_natural(self, node: int) -> bool:
+        """Whether the object of an object node is natural"""
+        pass
+
+    @abstractmethod
+    def is_category(self, node: int) -> bool:
+        """Whether the node is the object of a category"""
+        pass
+
+    @abstractmethod
+    def category_contents(self, node: int) -> List[int]:
+        """Identifiers of the objects contained by a category node"""
+        pass
+
+    @abstractmethod
+    def edge_ends(self, edge: int) -> Tuple[int, int]:
+        """From and to nodes of the edge"""
+        pass
+
+    @abstractmethod
+    def edge_category(self, edge: int) -> EdgeType:
+        """Category of the edge"""
+        pass
+
+    @abstractmethod
+    def edge_seconds(self, edge: int) -> int:
+        """Time of the transition of the edge, 0 if instant or none"""
+        pass
+
+    @abstractmethod
+    def _set_looping(self, edge: int, looping: bool) -> None:
+        pass
+
+    @abstractmethod
+    def _graphviz_decl(self, node: int) -> str:
+        """How to declare the node to graphviz"""
+        pass
+
+    @abstractmethod
+    def _graphviz_name(self, node: int) -> str:
+        """How to use the node in graphviz"""
+        pass
+
+    def edge_cost(self, edge: int) -> int:
+        """Cost of the edge in the graph"""
+        return category_cost(self.edge_category(edge))
+
+    def _is_reached(self, node: int) -> bool:
+        """Whether the node can be made, once complexities are computed"""
+        if not self.is_transition(node):
+            return self.complexity(node) < GraphNode.DEFAULT_COMPLEXITY
+        # Transitions need all their inputs, which are objects
+        parents = [parent for parent, _ in self.get_in(node)]
+        return bool(parents) and all(
+            self.complexity(parent) < GraphNode.DEFAULT_COMPLEXITY
+            for parent in parents)
+
+    def _reset_complexity(self, node: int) -> None:
+        """Set back the complexity to its value before any propagation"""
+        if self.is_transition(node):
+            self._set_complexity(node, -1)
+        elif self.is_natural(node):
+            self._set_complexity(node, 0)
+        else:
+            self._set_complexity(node, GraphNode.DEFAULT_COMPLEXITY)
+
+    def _receive_complexity(self, node: int, incoming: int,
+                            missing: List[int]) -> bool:
+        """Give node the final complexity of a parent plus the edge cost,
+        missing being the number of inputs not yet given to transitions.
+        Return True if the complexity of node is now known.
+        """
+        if self.is_transition(node):
+            self._set_complexity(node, max(self.complexity(node), incoming))
+            missing[node] -= 1
+            return missing[node] == 0
+        if incoming < self.complexity(node):
+            self._set_complexity(node, incoming)
+            return True
+        return False
+
+    def _propagate_complexity(self, nodes: Optional[List[int]]) -> None:
+        """Compute the complexity of the given nodes, or of all nodes, from
+        their reset complexity. Other nodes keep theirs, and must not be
+        children of the given nodes.
+        """
+        node_count = self.node_count()
+        finalized = [nodes is not None for _ in range(node_count)]
+        to_compute = range(node_count) if nodes is None else nodes
+        missing = [0 for _ in range(node_count)]
+        for node in to_compute:
+            finalized[node] = False
+            if self.is_transition(node):
+                missing[node] = sum(1 for _ in self.get_in(node))
+        if nodes is not None:
+            self._receive_finalized(nodes, finalized, missing)
+
+        # Edges cost 0 or 1, and transitions are as complex as their most
+        # complex input, so a bucket queue finalizes nodes in increasing
+        # complexity, each one exactly once. When a node is finalized, its
+        # children receive its final complexity.
+        buckets = {}  # type: Dict[int, List[int]]
+        for node in to_compute:
+            complexity = self.complexity(node)
+            if 0 <= complexity < GraphNode.DEFAULT_COMPLEXITY and \
+                    missing[node] == 0:
+                buckets.setdefault(complexity, []).append(node)
+        while buckets:
+            distance = min(buckets)
+            self._finalize_bucket(distance, buckets, finalized, missing)
+
+    def _receive_finalized(self, nodes: List[int], finalized: List[bool],
+                           missing: List[int]) -> None:
+        """Give the given nodes the complexity of their finalized parents"""
+        for node in nodes:
+            for parent, edge in self.get_in(node):
+                if finalized[parent] and self._is_reached(parent):
+                    self._receive_complexity(
+                        node,
+                        self.complexity(parent) + self.edge_cost(edge),
+                        missing)
+
+    def _finalize_bucket(self, distance: int, buckets: Dict[int, List[int]],
+                         finalized: List[bool], missing: List[int]) -> None:
+        """Finalize the nodes of the given complexity, their children
+        receiving it and being added to the bucket of their complexity
+        """
+        current = buckets.pop(distance)
+        while current:
+            node = current.pop()
+            if finalized[node]:
+                continue
+            finalized[node] = True
+            for child, edge in self.get_out(node):
+                if self._receive_complexity(
+                        child, distance + self.edge_cost(edge), missing):
+                    complexity = self.complexity(child)
+                    if complexity == distance:
+                        current.append(child)
+                    else:
+                        buckets.setdefault(complexity, []).append(child)
+
+    def _warn_unreachable(self) -> None:
+        if not _LOGGER.isEnabledFor(logging.WARNING):
+            return
+        unreachable = sorted(self.unreachable)
+        for identifier in unreachable[:MAX_UNREACHABLE_WARNINGS]:
+            _LOGGER.warning("Object %s (%d) is unreachable",
+                            self.object_name(self.obj_to_node[identifier]),
+                            identifier)
+        if len(unreachable) > MAX_UNREACHABLE_WARNINGS:
+            _LOGGER.warning("%d more objects are unreachable",
+                            len(unreachable) - MAX_UNREACHABLE_WARNINGS)
+
+    def _find_components(self, nodes: Optional[List[int]],
+                         old_scc: Optional[Sequence[int]]) -> List[int]:
+        """Components of all nodes, or only of the given nodes, the other
+        ones keeping their component in old_scc.
+        """
+        if nodes is None:
+            children = [[child for child, _ in self.get_out(node)]
+                        for node in range(self.node_count())]
+            return strongly_connected_components(self.node_count(),
+                                                 children.__getitem__)
+        assert old_scc is not None
+        scc = strongly_connected_components(
+            self.node_count(),
+            lambda node: (child for child, _ in self.get_out(node)), nodes)
+        # Given nodes have no path to the other ones, whose components are
+        # unchanged and come after in reverse topological order
+        kept = sorted(
+            set(old_scc[node] for node, component in enumerate(scc)
+                if component == -1))
+        first = max(scc) + 1
+        shift = {component: first + i for i, component in enumerate(kept)}
+        return [
+            component if component != -1 else shift[old_scc[node]]
+            for node, component in enumerate(scc)
+        ]
+
+    def _loop_candidates(
+            self, nodes: Iterable[int]) -> Dict[int, List[Tuple[int, int]]]:
+        """Possible (from_node, edge) to remove, by to_node, inside the
+        components of the given nodes
+        """
+        scc = self.scc
+        possible = {}  # type: Dict[int, List[Tuple[int, int]]]
+        for i in nodes:
+            if len(self.components[scc[i]]) == 1:
+                continue
+            parents = ((parent, edge) for parent, edge in self.get_in(i)
+                       if scc[parent] == scc[i])
             for parent, edge in parents:
-                if edge.category in (EdgeType.BARE_HANDS, EdgeType.INTERACT,
-                                     EdgeType.NATURAL, EdgeType.DROP,
-                                     EdgeType.CONSUME):
-                    distance = self._nodes[parent].complexity
-                    children = ((c, e) for c, e in self.get_out(i)
-                                if scc[c] == scc[i]
-                                and self._nodes[c].complexity < distance)
+                if self.edge_category(edge) in (EdgeType.BARE_HANDS,
+                                                EdgeType.INTERACT,
+                                                EdgeType.NATURAL,
+                                                EdgeType.DROP,
+                                                EdgeType.CONSUME):
+                    distance = self.complexity(parent)
+                    children = (
+                        (c, e) for c, e in self.get_out(i)
+                        if scc[c] == scc[i] and self.complexity(c) < distance)
                     for child, edge_child in children:
-                        possible_from.append(parent)
-                        possible_to.append(child)
-                        possible_edge.append(edge_child)
+                        possible.setdefault(child, []).append((parent,
+                                                               edge_child))
+        return possible
+
+    def _mark_loops(self, nodes: Optional[List[int]]) -> None:
+        """Mark looping edges inside the components of the given nodes, or
+        of all nodes, edges of other components keeping their mark.
+        """
+        # Position of each node in its component
+        scc = self.scc
+        members_of = self.components
+        position = [0 for _ in range(self.node_count())]
+        for members in members_of:
+            for i, node in enumerate(members):
+                position[node] = i
+        possible = self._loop_candidates(
+            range(self.node_count()) if nodes is None else nodes)
+
+        # Children of nodes in a component, with edge cost, by position
+        local_children = {}  # type: Dict[int, List[List[Tuple[int, int]]]]
         delete_edges = []  # type: List[int]
-        for from_node, to_node, edg in zip(possible_from, possible_to,
-                                           possible_edge):
+        for to_node, from_edges in possible.items():
             # If we are here, this means that we want to remove the connection
             # from from_node to to_node, because from one we can make the
             # other, and vice versa. Also from_node is more complex than
             # to_node. Problem is, Straw is more complex than a Basket (that
             # can be made simply with Reed), and we want to keep the connection
             # from Straw to Basket.
-            distances = [(-1) for _ in range(len(self._nodes))]
-            distances[to_node] = 0
-            to_visit = {to_node}
-            while to_visit:
-                current = to_visit.pop()
-                current_distance = distances[current]
-                for child, child_edge in self.get_out(current):
-                    if scc[child] != scc[to_node]:
-                        continue
-                    new_dist = current_distance + self._edges[child_edge].cost(
-                    )
-                    if distances[child] == -1 or distances[child] > new_dist:
-                        distances[child] = new_dist
-                        to_visit.add(child)
-
-            diff = self._nodes[from_node].complexity - \
-                    self._nodes[to_node].complexity
-            if distances[from_node] <= diff:
-                delete_edges.append(edg)
+            component_index = scc[to_node]
+            if component_index not in local_children:
+                local_children[component_index] = self._component_children(
+                    members_of[component_index], position)
+            # Maximum distance for the edge to be removed, by position
+            max_distances = {}  # type: Dict[int, int]
+            for from_node, _ in from_edges:
+                max_distances[position[from_node]] = \
+                    self.complexity(from_node) - self.complexity(to_node)
+            distances = component_distances(local_children[component_index],
+                                            position[to_node], max_distances)
+            for from_node, edg in from_edges:
+                from_position = position[from_node]
+                if 0 <= distances[from_position] <= \
+                        max_distances[from_position]:
+                    delete_edges.append(edg)
 
         for delete in delete_edges:
-            self._edges[delete].looping = True
-
-    def _is_edge_valid(self, edge_id: int, ignored_nodes: Set[int],
-                       ignored_edges: Set[int],
+            self._set_looping(delete, True)
+
+    def _component_children(self, members: Sequence[int], position: List[int]
+                            ) -> List[List[Tuple[int, int]]]:
+        """Children inside the component, and edge cost, by position"""
+        scc = self.scc
+        return [[(position[child], self.edge_cost(edge))
+                 for child, edge in self.get_out(node)
+                 if scc[child] == scc[node]] for node in members]
+
+    def _is_edge_valid(self, edge_id: int, ignored_nodes: AbstractSet[int],
+                       ignored_edges: AbstractSet[int],
                        proxy_nodes: Dict[int, int]) -> bool:
         if edge_id in ignored_edges:
             return False
-        edge = self._edges[edge_id]
-        from_node = _get_node_through_proxy(edge.from_node, proxy_nodes)
-        to_node = _get_node_through_proxy(edge.to_node, proxy_nodes)
+        from_node, to_node = self.edge_ends(edge_id)
+        from_node = _get_node_through_proxy(from_node, proxy_nodes)
+        to_node = _get_node_through_proxy(to_node, proxy_nodes)
         if from_node == to_node:
             return False
         return not any(i in ignored_nodes for i in (from_node, to_node))
 
-    def to_graphviz(self,
-                    ignored_nodes: Optional[Set[int]] = None,
-                    ignored_edges: Optional[Set[int]] = None,
-                    proxy_nodes: Optional[Dict[int, int]] = None) -> str:
-        """Make a graphviz"""
+    def _edge_graphviz(self, edge: int, proxy_nodes: Dict[int, int]) -> str:
+        from_node, to_node = self.edge_ends(edge)
+        return edge_graphviz(
+            self._graphviz_name(
+                _get_node_through_proxy(from_node, proxy_nodes)),
+            self._graphviz_name(_get_node_through_proxy(to_node, proxy_nodes)),
+            self.edge_category(edge), self.edge_seconds(edge))
+
+    def iter_graphviz(self,
+                      ignored_nodes: Optional[AbstractSet[int]] = None,
+                      ignored_edges: Optional[AbstractSet[int]] = None,
+                      proxy_nodes: Optional[Dict[int, int]] = None,
+                      nodes: Optional[Iterable[int]] = None) -> Iterator[str]:
+        """Make a graphviz, one line after the other.
+        If given, nodes must include all nodes not ignored: only them and
+        their edges are looked at, which is faster on small subgraphs.
+        """
         if ignored_nodes is None:
             ignored_nodes = set()
         if ignored_edges is None:
             ignored_edges = set()
         if proxy_nodes is None:
             proxy_nodes = {}
-        graph = "digraph G {\n"
-        for i, node in enumerate(self._nodes):
+        if nodes is None:
+            node_ids = range(self.node_count())  # type: Iterable[int]
+            edge_ids = range(self.edge_count())  # type: Iterable[int]
+        else:
+            node_ids = sorted(nodes)
+            # Edges through a proxy node have both ends in nodes too
+            edge_ids = sorted(
+                edge for node in node_ids for _, edge in self.get_out(node))
+        yield "digraph G {\n"
+        for i in node_ids:
             if i not in ignored_nodes and i not in proxy_nodes:
-                graph += '    {};\n'.format(node.graphviz_decl())
-        for i, edge in enumerate(self._edges):
+                yield '    {};\n'.format(self._graphviz_decl(i))
+        for i in edge_ids:
             if self._is_edge_valid(i, ignored_nodes, ignored_edges,
                                    proxy_nodes):
-                graph += '    {};\n'.format(
-                    edge.graphviz(self._nodes, proxy_nodes))
-        graph += '}'
+                yield '    {};\n'.format(self._edge_graphviz(i, proxy_nodes))
+        yield '}'
+
+    def write_graphviz(self,
+                       out_file: TextIO,
+                       ignored_nodes: Optional[AbstractSet[int]] = None,
+                       ignored_edges: Optional[AbstractSet[int]] = None,
+                       proxy_nodes: Optional[Dict[int, int]] = None,
+                       nodes: Optional[Iterable[int]] = None) -> None:
+        """Write a graphviz to a file, without building it in memory"""
+        out_file.writelines(
+            self.iter_graphviz(ignored_nodes, ignored_edges, proxy_nodes,
+                               nodes))
+
+    def to_graphviz(self,
+                    ignored_nodes: Optional[AbstractSet[int]] = None,
+                    ignored_edges: Optional[AbstractSet[int]] = None,
+                    proxy_nodes: Optional[Dict[int, int]] = None,
+                    nodes: Optional[Iterable[int]] = None) -> str:
+        """Make a graphviz"""
+        return ''.join(
+            self.iter_graphviz(ignored_nodes, ignored_edges, proxy_nodes,
+                               nodes))
+
+
+class Graph(BaseGraph):
+    """Graph of node and edge objects, which can be updated"""
+
+    def __init__(self,
+                 objects: Dict[int, Object],
+                 transitions: List[Transition],
+                 profiler: Profiler = NO_PROFILER) -> None:
+        super().__init__()
+        self._nodes = []  # type: List[GraphNode]
+        self._edges = []  # type: List[Edge]
+        self._incoming_edges = []  # type: List[List[int]]
+        self._out_edges = []  # type: List[List[int]]
+        self.obj_to_node = {}  # type: Dict[int, int]
+        self.unreachable = set()  # type: Set[int]
+        self.components = []  # type: List[List[int]]
+
+        with profiler.phase('create') as phase:
+            self._create(objects, transitions)
+            phase.counts['nodes'] = len(self._nodes)
+            phase.counts['edges'] = len(self._edges)
+        self._finish_computation(profiler)
+
+    @classmethod
+    def from_computed(cls, objects: Dict[int, Object],
+                      transitions: List[Transition], complexity: Sequence[int],
+                      looping_edges: Iterable[int],
+                      scc: Sequence[int]) -> 'Graph':
+        """Graph of objects and transitions whose complexity of each node,
+        looping edges and components were already computed, in the order of
+        the nodes and edges of their Graph. Nothing is computed again.
+        """
+        graph = cls({}, [])
+        graph._create(objects, transitions)
+        graph._build_adjacency()
+        for node, value in zip(graph._nodes, complexity):
+            node.complexity = value
+        for edge in looping_edges:
+            graph._edges[edge].looping = True
+        graph.looping_edges = frozenset(
+            i for i, edge in enumerate(graph._edges) if edge.looping)
+        graph.unreachable = set(
+            node.obj.identifier for node in graph._nodes
+            if isinstance(node, NodeObject)
+            and node.complexity == node.DEFAULT_COMPLEXITY)
+        graph.scc = list(scc)
+        graph.components = component_members(graph.scc)
         return graph
 
+    def _create(self, objects: Dict[int, Object],
+                transitions: List[Transition]) -> None:
+        """Make graph for objects"""
+        # Create nodes:
+        for obj in objects.values():
+            if obj.identifier > 0:
+                self._add_object(obj)
+        # Add category edges
+        for obj in objects.values():
+            self._add_category_edges(obj)
+        # Add transition edges
+        for transition in transitions:
+            self._add_transition(transition)
+
+    def _add_object(self, obj: Object) -> None:
+        self.obj_to_node[obj.identifier] = len(self._nodes)
+        self._nodes.append(NodeObject(obj))
+
+    def _add_category_edges(self, obj: Object) -> None:
+        for contains in obj.category_contains:
+            self._edges.append(
+                Edge(self.obj_to_node[contains.identifier],
+                     self.obj_to_node[obj.identifier], EdgeType.CATEGORY,
+                     None))
+
+    def _add_transition(self, transition: Transition) -> None:
+        node = len(self._nodes)
+        self._nodes.append(NodeTransition(transition))
+        outputs = list(transition.get_output_objects())
+        inputs = list(transition.get_input_objects())
+        for output in outputs:
+            if output not in inputs:
+                self._edges.append(
+                    Edge(node, self.obj_to_node[output], EdgeType.TRANSITION,
+                         None))
+        for input_ in inputs:
+            edge_type = transition_edge_type(transition.type)
+            if edge_type == EdgeType.CONSUME and input_ in outputs:
+                edge_type = EdgeType.TOOL
+            self._edges.append(
+                Edge(self.obj_to_node[input_], node, edge_type, transition))
+
+    def _remove_nodes(self, removed_nodes: Set[int],
+                      removed_category_edges: Set[int]) -> List[int]:
+        """Remove nodes with their edges, and category edges to some nodes.
+        Remaining nodes and edges keep their relative order. Return the new
+        index of each node, meaningless for removed nodes.
+        """
+        new_index = []  # type: List[int]
+        nodes = []  # type: List[GraphNode]
+        for i, node in enumerate(self._nodes):
+            new_index.append(len(nodes))
+            if i not in removed_nodes:
+                nodes.append(node)
+        edges = []  # type: List[Edge]
+        for edge in self._edges:
+            if edge.from_node in removed_nodes or \
+                    edge.to_node in removed_nodes:
+                continue
+            if edge.category == EdgeType.CATEGORY and \
+                    edge.to_node in removed_category_edges:
+                continue
+            edge.from_node = new_index[edge.from_node]
+            edge.to_node = new_index[edge.to_node]
+            edges.append(edge)
+        self._nodes = nodes
+        self._edges = edges
+        self.obj_to_node = {
+            identifier: new_index[node]
+            for identifier, node in self.obj_to_node.items()
+            if node not in removed_nodes
+        }
+        return new_index
+
+    def update(self, changes: DatabankUpdate,
+               profiler: Profiler = NO_PROFILER) -> None:
+        """Patch the graph after an incremental update of its databank.
+        Nodes and edges of unchanged objects and transitions are kept, and
+        the derived data (complexities, components, loops) is only computed
+        again for the nodes downstream of a change.
+        New nodes and edges are appended, so their order differs from a
+        graph built from scratch: among equally complex parents, the least
+        complex parent kept by a SubGraph may not be the same one.
+        """
+        if not changes:
+            return
+        with profiler.phase('patch') as phase:
+            removed_transitions = set(
+                id(t) for t in changes.removed_transitions)
+            removed_nodes = set(self.obj_to_node[obj.identifier]
+                                for obj in changes.removed_objects)
+            for i, node in enumerate(self._nodes):
+                if isinstance(node, NodeTransition) and \
+                        id(node.transition) in removed_transitions:
+                    removed_nodes.add(i)
+            categories = set(self.obj_to_node[obj.identifier]
+                             for obj in changes.updated_categories
+                             if obj.identifier in self.obj_to_node)
+            # Nodes whose parents or own complexity may change
+            changed = categories | set(self.obj_to_node[obj.identifier]
+                                       for obj in changes.updated_objects)
+            for removed in removed_nodes:
+                changed.update(child for child, _ in self.get_out(removed))
+            changed -= removed_nodes
+            old_scc = [
+                component for i, component in enumerate(self.scc)
+                if i not in removed_nodes
+            ]
+            new_index = self._remove_nodes(removed_nodes, categories)
+            changed = set(new_index[i] for i in changed)
+
+            first_added = len(self._nodes)
+            for obj in changes.added_objects:
+                self._add_object(obj)
+            for obj in changes.updated_categories:
+                self._add_category_edges(obj)
+            for transition in changes.added_transitions:
+                self._add_transition(transition)
+            changed.update(range(first_added, len(self._nodes)))
+            changed.update(self.obj_to_node[obj.identifier]
+                           for obj in changes.updated_categories)
+            self.unreachable.difference_update(
+                obj.identifier for obj in changes.removed_objects)
+            phase.counts['changed'] = len(changed)
+
+        self._finish_computation(profiler, changed, old_scc)
+        self.version += 1
+
+    def _finish_computation(self,
+                            profiler: Profiler,
+                            changed: Optional[Set[int]] = None,
+                            old_scc: Optional[Sequence[int]] = None) -> None:
+        """To be called after adding nodes and/or edges, each phase being
+        measured by the given profiler. Only nodes downstream of changed
+        nodes are computed again if given, old_scc being the components of
+        the nodes kept before nodes were added.
+        """
+
+        with profiler.phase('adjacency'):
+            self._build_adjacency()
+
+        affected = None  # type: Optional[List[int]]
+        if changed is not None:
+            affected = self.__descendants(changed)
+            for node in affected:
+                self._reset_complexity(node)
+                for edge_n in self._incoming_edges[node]:
+                    self._edges[edge_n].looping = False
+
+        with profiler.phase('complexity') as phase:
+            self._propagate_complexity(affected)
+            self.__update_unreachable(affected)
+            if affected is not None:
+                phase.counts['nodes'] = len(affected)
+
+        with profiler.phase('components') as phase:
+            self.scc = self._find_components(affected, old_scc)
+            self.components = component_members(self.scc)
+            phase.counts['components'] = len(self.components)
+
+        with profiler.phase('loops'):
+            self._mark_loops(affected)
+            self.looping_edges = frozenset(
+                i for i, edge in enumerate(self._edges) if edge.looping)
+
+    def _build_adjacency(self) -> None:
+        """Update the incoming and out edges of each node"""
+        self._incoming_edges = [[] for _ in range(len(self._nodes))]
+        self._out_edges = [[] for _ in range(len(self._nodes))]
+        for i, edge in enumerate(self._edges):
+            self._out_edges[edge.from_node].append(i)
+            self._incoming_edges[edge.to_node].append(i)
+
+    def __update_unreachable(self, nodes: Optional[List[int]]) -> None:
+        """Update unreachable objects among the given nodes, or all nodes"""
+        if nodes is None:
+            self.unreachable = set(
+                node.obj.identifier for node in self._nodes
+                if isinstance(node, NodeObject)
+                and node.complexity == node.DEFAULT_COMPLEXITY)
+            self._warn_unreachable()
+            return
+        for graph_node in (self._nodes[i] for i in nodes):
+            if isinstance(graph_node, NodeObject):
+                if graph_node.complexity == graph_node.DEFAULT_COMPLEXITY:
+                    self.unreachable.add(graph_node.obj.identifier)
+                else:
+                    self.unreachable.discard(graph_node.obj.identifier)
+        self._warn_unreachable()
+
+    def __descendants(self, nodes: Iterable[int]) -> List[int]:
+        """Given nodes and all nodes leading from them, in increasing order"""
+        seen = set(nodes)
+        to_visit = list(seen)
+        while to_visit:
+            for child, _ in self.get_out(to_visit.pop()):
+                if child not in seen:
+                    seen.add(child)
+                    to_visit.append(child)
+        return sorted(seen)
+
+    def databank(self) -> Tuple[Dict[int, Object], List[Transition]]:
+        """Objects and transitions of the nodes, in the order of nodes"""
+        objects = {}  # type: Dict[int, Object]
+        transitions = []  # type: List[Transition]
+        for node in self._nodes:
+            if isinstance(node, NodeObject):
+                objects[node.obj.identifier] = node.obj
+            else:
+                assert isinstance(node, NodeTransition)
+                transitions.append(node.transition)
+        return objects, transitions
+
+    def node_count(self) -> int:
+        return len(self._nodes)
+
+    def edge_count(self) -> int:
+        return len(self._edges)
+
     def get_out(self, node: int) -> Iterator[Tuple[int, int]]:
-        """Get children nodes and its edge, if still in the graph"""
         for edge_n in self._out_edges[node]:
             yield (self._edges[edge_n].to_node, edge_n)
 
+    def get_in(self, node: int) -> Iterator[Tuple[int, int]]:
+        for edge_n in self._incoming_edges[node]:
+            yield (self._edges[edge_n].from_node, edge_n)
+
+    def complexity(self, node: int) -> int:
+        return self._nodes[node].complexity
+
+    def _set_complexity(self, node: int, complexity: int) -> None:
+        self._nodes[node].complexity = complexity
+
+    def is_transition(self, node: int) -> bool:
+        return isinstance(self._nodes[node], NodeTransition)
+
+    def _object(self, node: int) -> Object:
+        graph_node = self._nodes[node]
+        assert isinstance(graph_node, NodeObject)
+        return graph_node.obj
+
+    def object_id(self, node: int) -> int:
+        return self._object(node).identifier
+
+    def object_name(self, node: int) -> str:
+        return self._object(node).name
+
+    def is_natural(self, node: int) -> bool:
+        return self._object(node).is_natural
+
+    def is_category(self, node: int) -> bool:
+        graph_node = self._nodes[node]
+        return isinstance(graph_node, NodeObject) and \
+            graph_node.obj.is_category
+
+    def category_contents(self, node: int) -> List[int]:
+        return [i.identifier for i in self._object(node).category_contains]
+
+    def edge_ends(self, edge: int) -> Tuple[int, int]:
+        return self._edges[edge].from_node, self._edges[edge].to_node
+
+    def edge_category(self, edge: int) -> EdgeType:
+        return self._edges[edge].category
+
+    def edge_cost(self, edge: int) -> int:
+        return self._edges[edge].cost()
+
+    def edge_seconds(self, edge: int) -> int:
+        return self._edges[edge].seconds()
+
+    def _set_looping(self, edge: int, looping: bool) -> None:
+        self._edges[edge].looping = looping
+
+    def _graphviz_decl(self, node: int) -> str:
+        return self._nodes[node].graphviz_decl()
+
+    def _graphviz_name(self, node: int) -> str:
+        return self._nodes[node].graphviz_name()
+
 
-def load_databank_graph(root_folder: str) -> Graph:
-    """Get full graph of all transitions in the databank"""
-    databank = load_databank(root_folder)
-    return Graph(databank[0], databank[1])
+def load_databank_graph(root_folder: str,
+                        workers: int = 1,
+                        profiler: Profiler = NO_PROFILER,
+                        loader: DatabankLoader = load_databank) -> Graph:
+    """Get full graph of all transitions in the databank, loaded by loader"""
+    with profiler.phase('databank'):
+        databank = loader(root_folder, workers, profiler)
+    with profiler.phase('graph'):
+        return Graph(databank[0], databank[1], profiler)
@@ -0,0 +1,204 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Index of object names, resolving names to object identifiers"""
+
+import bisect
+import difflib
+import pickle
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from mamaty.databank import Object
+from mamaty.graph import BaseGraph
+
+# Bump when the layout of saved name indexes changes
+NAMES_VERSION = 1
+
+_TOKEN = re.compile(r'\w+')
+
+
+def normalize(name: str) -> str:
+    """Case-insensitive form of a name, used as key"""
+    return ' '.join(name.casefold().split())
+
+
+def tokens(name: str) -> List[str]:
+    """Case-insensitive words of a name"""
+    return _TOKEN.findall(name.casefold())
+
+
+class NameIndex:  # pylint: disable=protected-access
+    """Object identifiers by exact name, name prefix and name words, with a
+    fuzzy fallback. Names are case-insensitive. Object names are read once,
+    so that lazy objects are not needed after the index is saved.
+    """
+
+    def __init__(self, objects: Iterable[Object]) -> None:
+        self.names = {}  # type: Dict[int, str]
+        # Objects contained by each category
+        self.categories = {}  # type: Dict[int, Tuple[int, ...]]
+        for obj in objects:
+            self.names[obj.identifier] = obj.name
+            if obj.is_category:
+                self.categories[obj.identifier] = tuple(
+                    sorted(i.identifier for i in obj.category_contains))
+        self._build()
+
+    @classmethod
+    def from_graph(cls, graph: BaseGraph) -> 'NameIndex':
+        """Index of the objects of graph, without needing Object instances"""
+        index = cls(())
+        for node in graph.obj_to_node.values():
+            identifier = graph.object_id(node)
+            index.names[identifier] = graph.object_name(node)
+            if graph.is_category(node):
+                index.categories[identifier] = tuple(
+                    sorted(graph.category_contents(node)))
+        index._build()
+        return index
+
+    def _build(self) -> None:
+        exact = {}  # type: Dict[str, List[int]]
+        words = {}  # type: Dict[str, Set[int]]
+        for identifier, name in sorted(self.names.items()):
+            exact.setdefault(normalize(name), []).append(identifier)
+            for token in tokens(name):
+                words.setdefault(token, set()).add(identifier)
+        self._exact = {key: tuple(ids) for key, ids in exact.items()}
+        # Sorted keys, where keys with a given prefix are contiguous
+        self._keys = sorted(self._exact)
+        self._words = {key: frozenset(ids) for key, ids in words.items()}
+
+    def exact(self, name: str) -> List[int]:
+        """Objects named name"""
+        return list(self._exact.get(normalize(name), ()))
+
+    def prefix(self, prefix: str, limit: Optional[int] = None) -> List[int]:
+        """Objects whose name starts with prefix, by name"""
+        prefix = normalize(prefix)
+        found = []  # type: List[int]
+        position = bisect.bisect_left(self._keys, prefix)
+        while position < len(self._keys) and \
+                self._keys[position].startswith(prefix):
+            found.extend(self._exact[self._keys[position]])
+            if limit is not None and len(found) >= limit:
+                return found[:limit]
+            position += 1
+        return found
+
+    def words(self, query: str) -> List[int]:
+        """Objects whose name contains all words of query"""
+        sets = [self._words.get(token, frozenset()) for token in tokens(query)]
+        if not sets:
+            return []
+        sets.sort(key=len)
+        return sorted(sets[0].intersection(*sets[1:]))
+
+    def fuzzy(self, query: str, limit: int = 10,
+              cutoff: float = 0.6) -> List[int]:
+        """Objects whose name is close to query, closest first"""
+        found = []  # type: List[int]
+        for key in difflib.get_close_matches(
+                normalize(query), self._keys, limit, cutoff):
+            found.extend(self._exact[key])
+        return found[:limit]
+
+    def category(self, name: str) -> List[int]:
+        """Objects contained by the categories named name"""
+        contained = set()  # type: Set[int]
+        for identifier in self.exact(name):
+            contained.update(self.categories.get(identifier, ()))
+        return sorted(contained)
+
+    def _match(self, query: str, limit: int) -> List[int]:
+        """Objects matching query, trying in order an identifier, an exact
+        name, a name prefix, name words and finally close names. An empty
+        query matches nothing.
+        """
+        query = query.strip()
+        if not query:
+            return []
+        if query.isdigit():
+            return [int(query)] if int(query) in self.names else []
+        found = self.exact(query)
+        if found:
+            return found[:limit]
+        found = self.prefix(query, limit)
+        if found:
+            return found
+        found = self.words(query)
+        if found:
+            return found[:limit]
+        return self.fuzzy(query, limit)
+
+    def search(self, query: str, limit: int = 10) -> List[int]:
+        """Objects matching query, the objects contained by a category if
+        query names one, see _match otherwise
+        """
+        if query.strip().startswith('@'):
+            found = self.category(query)
+            if found:
+                return found[:limit]
+        return self._match(query, limit)
+
+    def resolve(self, query: str) -> Optional[int]:
+        """Object identified by query, or None if unknown or ambiguous.
+        A category is the object itself, not its content.
+        """
+        found = self._match(query, 2)
+        return found[0] if len(found) == 1 else None
+
+    def describe(self, identifiers: Iterable[int]) -> List[Tuple[int, str]]:
+        """Identifiers with their name"""
+        return [(i, self.names[i]) for i in identifiers]
+
+    def save(self, filename: str, data_version: str = '') -> None:
+        """Save the index, data_version identifying the databank"""
+        with open(filename, 'wb') as out_file:
+            pickle.dump(
+                (NAMES_VERSION, data_version, self.names, self.categories,
+                 self._exact, self._keys, self._words), out_file,
+                pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename: str,
+             data_version: str = '') -> Optional['NameIndex']:
+        """Load an index saved for this databank, or None if not matching"""
+        try:
+            with open(filename, 'rb') as in_file:
+                data = pickle.load(in_file)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        if data[:2] != (NAMES_VERSION, data_version):
+            return None
+        index = cls.__new__(cls)
+        index.names, index.categories, index._exact, index._keys, \
+            index._words = data[2:]
+        return index
+
+
+def load_or_build_names(filename: str,
+                        graph: BaseGraph,
+                        data_version: str = '') -> NameIndex:
+    """Load the index if saved for this databank, otherwise build and save
+    it
+    """
+    index = NameIndex.load(filename, data_version)
+    if index is None:
+        index = NameIndex.from_graph(graph)
+        index.save(filename, data_version)
+    return index
@@ -0,0 +1,148 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Time and memory used by each phase of loading and computing graphs"""
+
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+
+class Phase:
+    """Measures of a phase, counts being filled in by the phase itself"""
+
+    def __init__(self, profiler: 'Profiler', name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.depth = 0
+        self.seconds = 0.
+        # Peak of traced memory above what was used before the phase
+        self.memory = None  # type: Optional[int]
+        self.counts = {}  # type: Dict[str, int]
+        self._start = 0.
+        self._start_memory = 0
+        self._peak = 0
+
+    def __enter__(self) -> 'Phase':
+        self.profiler._enter(self)  # pylint: disable=protected-access
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.profiler._exit(self)  # pylint: disable=protected-access
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Measures, to be written as JSON"""
+        result = {
+            'name': self.name,
+            'depth': self.depth,
+            'seconds': self.seconds,
+        }  # type: Dict[str, Any]
+        if self.memory is not None:
+            result['memory'] = self.memory
+        result.update(self.counts)
+        return result
+
+
+class Profiler:  # pylint: disable=protected-access
+    """Record phases, used as context managers:
+
+        with profiler.phase('name') as phase:
+            phase.counts['nodes'] = ...
+
+    Phases can be nested. With memory, the peak of memory allocated in
+    each phase is traced too, which makes everything slower.
+    """
+
+    def __init__(self, memory: bool = False) -> None:
+        self.memory = memory
+        self.phases = []  # type: List[Phase]
+        self._stack = []  # type: List[Phase]
+
+    def phase(self, name: str) -> Phase:
+        """Context manager measuring a phase"""
+        return Phase(self, name)
+
+    def _enter(self, phase: Phase) -> None:
+        phase.depth = len(self._stack)
+        self.phases.append(phase)
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]._peak = max(self._stack[-1]._peak, peak)
+            # Before Python 3.9 the peak cannot be reset, so it is the one
+            # since tracing started
+            if hasattr(tracemalloc, 'reset_peak'):
+                getattr(tracemalloc, 'reset_peak')()
+            phase._start_memory = current
+            phase._peak = current
+        self._stack.append(phase)
+        phase._start = time.perf_counter()
+
+    def _exit(self, phase: Phase) -> None:
+        phase.seconds = time.perf_counter() - phase._start
+        assert self._stack.pop() is phase
+        if self.memory:
+            phase._peak = max(phase._peak, tracemalloc.get_traced_memory()[1])
+            phase.memory = phase._peak - phase._start_memory
+            if self._stack:
+                self._stack[-1]._peak = max(self._stack[-1]._peak, phase._peak)
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        """Measures of all phases, to be written as JSON"""
+        return [phase.as_dict() for phase in self.phases]
+
+    def report(self) -> str:
+        """Human readable measures of all phases"""
+        lines = []  # type: List[str]
+        for phase in self.phases:
+            line = "{:<32} {:9.4f}s".format('  ' * phase.depth + phase.name,
+                                            phase.seconds)
+            if phase.memory is not None:
+                line += " {:9.1f}MiB".format(phase.memory / 1024 / 1024)
+            for name, count in sorted(phase.counts.items()):
+                line += " {}={}".format(name, count)
+            lines.append(line)
+        return '\n'.join(lines)
+
+
+class _NoPhase(Phase):
+    """Phase measuring nothing"""
+
+    def __init__(self) -> None:  # pylint: disable=super-init-not-called
+        self.counts = {}
+
+    def __enter__(self) -> Phase:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.counts.clear()
+
+
+class _NoProfiler(Profiler):
+    """Profiler recording nothing, at the cost of a method call per phase"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._phase = _NoPhase()
+
+    def phase(self, name: str) -> Phase:
+        return self._phase
+
+
+# Used when profiling is disabled
+NO_PROFILER = _NoProfiler()  # type: Profiler
@@ -0,0 +1,184 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Cache of subgraphs leading to objects"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from mamaty.ancestors import AncestorIndex
+from mamaty.graph import BaseGraph
+from mamaty.subgraph import Settings, SubGraph
+
+# Object, subgraph settings and graph version
+_Key = Tuple[int, Settings, int]
+
+
+def deep_size(container: Iterable[int]) -> int:
+    """Memory used by a set or a dict of ints, including the ints"""
+    size = sys.getsizeof(container) + sum(sys.getsizeof(i) for i in container)
+    if isinstance(container, dict):
+        size += sum(sys.getsizeof(i) for i in container.values())
+    return size
+
+
+class CachedSubGraph:  # pylint: disable=protected-access
+    """Result of SubGraph.leading_to_obj, frozen"""
+
+    def __init__(self, subgraph: SubGraph,
+                 ignored_edges: FrozenSet[int]) -> None:
+        # Nodes of the subgraph, much less than the ignored ones
+        nodes = subgraph.nodes()
+        self.nodes = frozenset(nodes)
+        self.ignored_edges = ignored_edges
+        self.proxy_nodes = subgraph._compute_proxy(nodes)
+        self.graphviz = ''.join(
+            subgraph.graph.iter_graphviz(subgraph.ignored_nodes, ignored_edges,
+                                         self.proxy_nodes, nodes))
+
+    def size(self) -> int:
+        """Memory used, but for the ignored edges which may be shared"""
+        return sys.getsizeof(self) + deep_size(self.nodes) + deep_size(
+            self.proxy_nodes) + sys.getsizeof(self.graphviz)
+
+    def to_graphviz(self) -> str:
+        """Make a graphviz"""
+        return self.graphviz
+
+
+class SubGraphCache:  # pylint: disable=protected-access
+    """Least recently used subgraphs, bounded by their memory size.
+    Entries are keyed on object, subgraph settings and graph version, and
+    all dropped when the graph is modified. Identical ignored edges are
+    stored once, and counted in the size until no entry uses them. Safe to
+    use from several threads. Missing subgraphs are answered from index
+    when given.
+    """
+
+    def __init__(self,
+                 graph: BaseGraph,
+                 max_size: int = 64 * 1024 * 1024,
+                 index: Optional[AncestorIndex] = None) -> None:
+        self.graph = graph
+        self.index = index
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._version = graph.version
+        self._entries = OrderedDict(
+        )  # type: OrderedDict[_Key, CachedSubGraph]
+        # Ignored edges sets, and the number of entries using each one
+        self._edge_sets = {}  # type: Dict[FrozenSet[int], FrozenSet[int]]
+        self._edge_users = {}  # type: Dict[FrozenSet[int], int]
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._clear()
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._edge_sets.clear()
+        self._edge_users.clear()
+        self.size = 0
+        self._version = self.graph.version
+
+    def set_graph(self,
+                  graph: BaseGraph,
+                  index: Optional[AncestorIndex] = None) -> None:
+        """Use a rebuilt graph, dropping all entries"""
+        with self._lock:
+            self.graph = graph
+            self.index = index
+            self._clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss statistics"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def leading_to_obj(self, obj: int,
+                       settings: Optional[Settings] = None) -> CachedSubGraph:
+        """Subgraph leading to obj, with the given or default settings"""
+        subgraph = SubGraph(self.graph)
+        if settings is None:
+            settings = subgraph.settings()
+        key = (obj, settings, self.graph.version)
+        with self._lock:
+            if self._version != self.graph.version:
+                self._clear()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Computed without the lock, so that other queries are not blocked
+        subgraph.apply_settings(settings)
+        if self.index is not None:
+            self.index.leading_to_obj(subgraph, obj)
+        else:
+            subgraph.leading_to_obj(obj)
+        entry = CachedSubGraph(subgraph, frozenset(subgraph._ignored_edges))
+
+        with self._lock:
+            if key not in self._entries and key[2] == self._version:
+                self._add(key, entry)
+                while self.size > self.max_size and len(self._entries) > 1:
+                    self._evict()
+        return entry
+
+    def _add(self, key: _Key, entry: CachedSubGraph) -> None:
+        """Store an entry, sharing its ignored edges with other entries"""
+        edges = self._edge_sets.get(entry.ignored_edges)
+        if edges is None:
+            edges = self._edge_sets[entry.ignored_edges] = entry.ignored_edges
+            self._edge_users[edges] = 0
+            self.size += deep_size(edges)
+        entry.ignored_edges = edges
+        self._edge_users[edges] += 1
+        self._entries[key] = entry
+        self.size += entry.size()
+
+    def _evict(self) -> None:
+        """Drop the least recently used entry, and its ignored edges if no
+        other entry uses them
+        """
+        _, evicted = self._entries.popitem(last=False)
+        self.size -= evicted.size()
+        edges = evicted.ignored_edges
+        self._edge_users[edges] -= 1
+        if not self._edge_users[edges]:
+            del self._edge_users[edges]
+            del self._edge_sets[edges]
+            self.size -= deep_size(edges)
+        self.evictions += 1
+
+    def graphviz(self, obj: int, settings: Optional[Settings] = None) -> str:
+        """Graphviz of the subgraph leading to obj"""
+        return self.leading_to_obj(obj, settings).to_graphviz()
@@ -0,0 +1,142 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""HTTP server answering graphs leading to objects"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from mamaty.ancestors import AncestorIndex
+from mamaty.graph import BaseGraph
+from mamaty.names import NameIndex
+from mamaty.querycache import SubGraphCache
+
+
+class GraphRequestHandler(BaseHTTPRequestHandler):
+    """Answer GET /graph/<object-id-or-name> with the graphviz leading to
+    object, GET /search?q=<name> with matching objects and GET /stats with
+    statistics of the subgraph cache
+    """
+
+    @property
+    def graph_server(self) -> 'GraphServer':
+        """Server of the request"""
+        assert isinstance(self.server, GraphServer)
+        return self.server
+
+    def _object_id(self) -> Optional[int]:
+        """Object requested, or None if the path is invalid, or the name
+        unknown or ambiguous
+        """
+        parts = urlsplit(self.path).path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] != 'graph':
+            return None
+        if parts[1].isdigit():
+            return int(parts[1])
+        return self.graph_server.names.resolve(unquote(parts[1]))
+
+    def _search(self) -> None:
+        query = parse_qs(urlsplit(self.path).query).get('q', [''])[0]
+        names = self.graph_server.names
+        found = [{
+            'id': identifier,
+            'name': name
+        } for identifier, name in names.describe(names.search(query))]
+        self._send(json.dumps(found).encode(), 'application/json')
+
+    def _send(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Handle a request"""
+        if self.path == '/stats':
+            self._send(
+                json.dumps(self.graph_server.cache.stats()).encode(),
+                'application/json')
+            return
+        if urlsplit(self.path).path == '/search':
+            self._search()
+            return
+        object_id = self._object_id()
+        if object_id is None:
+            self.send_error(
+                404, "Expected /graph/<object-id-or-name>, with a known "
+                "and unambiguous name")
+            return
+        if object_id not in self.graph_server.graph.obj_to_node:
+            self.send_error(404, "Unknown object {}".format(object_id))
+            return
+        self._send(
+            self.graph_server.graphviz(object_id).encode(),
+            'text/vnd.graphviz; charset=utf-8')
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # pylint: disable=redefined-builtin
+        if self.graph_server.verbose:
+            super().log_message(format, *args)
+
+
+class GraphServer(HTTPServer):
+    """Server sharing one read-only graph between concurrent requests.
+    Requests are answered by a pool of the given number of threads, each
+    with its own SubGraph, and results are kept in a cache of the given size
+    in bytes. Object names are resolved with the given name index, or one
+    built from the graph.
+    """
+
+    def __init__(self,
+                 address: Tuple[str, int],
+                 graph: BaseGraph,
+                 verbose: bool = False,
+                 cache_size: int = 64 * 1024 * 1024,
+                 index: Optional[AncestorIndex] = None,
+                 names: Optional[NameIndex] = None,
+                 threads: int = 8) -> None:
+        super().__init__(address, GraphRequestHandler)
+        self.graph = graph
+        if names is None:
+            names = NameIndex.from_graph(graph)
+        self.names = names
+        self.verbose = verbose
+        self.cache = SubGraphCache(graph, cache_size, index)
+        self._executor = ThreadPoolExecutor(threads)
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        """Queue the request, to be answered by a thread of the pool"""
+        self._executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request: Any, client_address: Any) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # pylint: disable=broad-except
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._executor.shutdown()
+
+    def graphviz(self, object_id: int) -> str:
+        """Graphviz of the subgraph leading to object"""
+        return self.cache.graphviz(object_id)
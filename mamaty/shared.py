@@ -0,0 +1,90 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Graph in a memory-mapped file, shared by processes without copies"""
+
+import mmap
+import os
+import pickle
+import struct
+from typing import Any, Dict, List, Tuple
+
+from mamaty.compact import CompactGraph
+from mamaty.graph import BaseGraph, Graph
+
+# Bump when the layout of exported graphs changes
+SHARED_VERSION = 3
+
+# Size of the header, before the header itself
+_HEADER_SIZE = struct.Struct('<Q')
+
+# Arrays start at a multiple of this
+_ALIGNMENT = 8
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def export_graph(graph: BaseGraph, filename: str) -> None:
+    """Write a computed graph as flat arrays, to be attached by processes.
+    The file is only meant for this machine, using its native types.
+    """
+    if not isinstance(graph, CompactGraph):
+        assert isinstance(graph, Graph)
+        graph = CompactGraph.from_graph(graph)
+    # Name, type code, offset and length of each array, after the header
+    layout = []  # type: List[Tuple[str, str, int, int]]
+    offset = 0
+    for name, values in sorted(graph.arrays().items()):
+        offset = _align(offset)
+        layout.append((name, values.typecode, offset, len(values)))
+        offset += len(values) * values.itemsize
+    header = pickle.dumps((SHARED_VERSION, layout), pickle.HIGHEST_PROTOCOL)
+    start = _align(_HEADER_SIZE.size + len(header))
+
+    tmp_file = "{}.{}.tmp".format(filename, os.getpid())
+    with open(tmp_file, 'wb') as out_file:
+        out_file.write(_HEADER_SIZE.pack(len(header)))
+        out_file.write(header)
+        arrays = graph.arrays()
+        for name, _, offset, _ in layout:
+            out_file.seek(start + offset)
+            out_file.write(arrays[name].tobytes())
+    os.replace(tmp_file, filename)
+
+
+def attach_graph(filename: str) -> CompactGraph:
+    """Read-only graph whose arrays are views of the memory-mapped file:
+    nothing is built or copied in the process, pages of the file being
+    shared by all processes attaching it.
+    """
+    with open(filename, 'rb') as in_file:
+        mapped = mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ)
+    header_size, = _HEADER_SIZE.unpack_from(mapped)
+    version, layout = pickle.loads(
+        mapped[_HEADER_SIZE.size:_HEADER_SIZE.size + header_size])
+    if version != SHARED_VERSION:
+        raise ValueError("{} has an unsupported version".format(filename))
+    start = _align(_HEADER_SIZE.size + header_size)
+    # Views keep the mapping open as long as the graph uses them
+    view = memoryview(mapped)
+    arrays = {}  # type: Dict[str, Any]
+    for name, typecode, offset, length in layout:
+        item_size = struct.calcsize(typecode)
+        arrays[name] = view[start + offset:
+                            start + offset + length * item_size].cast(typecode)
+    return CompactGraph(arrays)
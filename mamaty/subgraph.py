@@ -17,9 +17,10 @@
 """Graph partial representation of transitions between objects"""
 
 from enum import Enum
-from typing import Dict, Iterator, Set
+from typing import AbstractSet, Dict, Iterator, MutableSet, Optional, Set
+from typing import TextIO, Tuple
 
-from mamaty.graph import Graph, NodeObject
+from mamaty.graph import BaseGraph
 
 
 class IgnoreMode(Enum):
@@ -30,44 +31,233 @@ class IgnoreMode(Enum):
     ALL_PARENTS = 3
 
 
+# max_distance, ignore_categories, ignore_natural and ignore_others
+Settings = Tuple[int, IgnoreMode, IgnoreMode, IgnoreMode]
+
+
+class _IgnoredNodes(MutableSet[int]):  # pylint: disable=protected-access
+    """Ignored nodes of a subgraph, seen as a set: nodes explicitly ignored,
+    and nodes not among the kept ones. Only iterating it is O(graph).
+    """
+
+    def __init__(self, subgraph: 'SubGraph') -> None:
+        self._subgraph = subgraph
+
+    def __contains__(self, node: object) -> bool:
+        return self._subgraph._is_ignored(node)  # type: ignore
+
+    def __iter__(self) -> Iterator[int]:
+        for i in range(self._subgraph.graph.node_count()):
+            if self._subgraph._is_ignored(i):
+                yield i
+
+    def __len__(self) -> int:
+        subgraph = self._subgraph
+        if subgraph._kept_nodes is None:
+            return len(subgraph._ignored_nodes)
+        return subgraph.graph.node_count() - len(subgraph.nodes())
+
+    def add(self, value: int) -> None:
+        self._subgraph.ignore_node(value)
+
+    def discard(self, value: int) -> None:
+        self._subgraph.unignore_node(value)
+
+
+class _IgnoredEdges(MutableSet[int]):  # pylint: disable=protected-access
+    """Ignored edges of a subgraph, seen as a set"""
+
+    def __init__(self, subgraph: 'SubGraph') -> None:
+        self._subgraph = subgraph
+
+    def __contains__(self, edge: object) -> bool:
+        return edge in self._subgraph._ignored_edges
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._subgraph._ignored_edges)
+
+    def __len__(self) -> int:
+        return len(self._subgraph._ignored_edges)
+
+    def add(self, value: int) -> None:
+        self._subgraph.ignore_edge(value)
+
+    def discard(self, value: int) -> None:
+        self._subgraph.unignore_edge(value)
+
+
 class SubGraph():  # pylint: disable=protected-access
     """Graph with some edges and nodes ignored"""
 
-    def __init__(self, graph: Graph) -> None:
+    def __init__(self, graph: BaseGraph) -> None:
         self.graph = graph
-        self.ignored_nodes = set()  # type: Set[int]
-        self.ignored_edges = set()  # type: Set[int]
-        for i, edge in enumerate(self.graph._edges):
-            if edge.looping:
-                self.ignored_edges.add(i)
+        # Parents and children of nodes, once ignore rules are applied
+        self._parents = {}  # type: Dict[int, Tuple[int, ...]]
+        self._children = {}  # type: Dict[int, Tuple[int, ...]]
+
+        # Ignored nodes are the ones explicitly ignored, and if not None the
+        # ones not kept, so that a small subgraph costs little
+        self._ignored_nodes = set()  # type: Set[int]
+        self._kept_nodes = None  # type: Optional[Set[int]]
+        # Looping edges of the graph, shared until modified
+        self._ignored_edges = graph.looping_edges  # type: AbstractSet[int]
 
         self.max_distance = 50
-        self.ignore_categories = IgnoreMode.ONLY_EXISTING_PARENTS
-        self.ignore_natural = IgnoreMode.NO_PARENTS
-        self.ignore_others = IgnoreMode.LEAST_COMPLEX_PARENT
+        self._ignore_categories = IgnoreMode.ONLY_EXISTING_PARENTS
+        self._ignore_natural = IgnoreMode.NO_PARENTS
+        self._ignore_others = IgnoreMode.LEAST_COMPLEX_PARENT
+
+    def invalidate(self) -> None:
+        """Forget computed parents and children, done whenever ignored nodes
+        or edges change
+        """
+        self._parents.clear()
+        self._children.clear()
+
+    def ignore_node(self, node: int) -> None:
+        """Remove a node from the subgraph"""
+        self._ignored_nodes.add(node)
+        self.invalidate()
+
+    def unignore_node(self, node: int) -> None:
+        """Put back a node in the subgraph"""
+        self._ignored_nodes.discard(node)
+        if self._kept_nodes is not None:
+            self._kept_nodes.add(node)
+        self.invalidate()
+
+    @property
+    def ignored_nodes(self) -> MutableSet[int]:
+        """Nodes not in the subgraph"""
+        return _IgnoredNodes(self)
 
-    def _compute_proxy(self) -> Dict[int, int]:
+    @ignored_nodes.setter
+    def ignored_nodes(self, nodes: AbstractSet[int]) -> None:
+        # Copied, so that the caller keeping it cannot make it stale
+        self._ignored_nodes = set(nodes)
+        self._kept_nodes = None
+        self.invalidate()
+
+    def ignore_edge(self, edge: int) -> None:
+        """Remove an edge from the subgraph"""
+        self._own_ignored_edges().add(edge)
+        self.invalidate()
+
+    def unignore_edge(self, edge: int) -> None:
+        """Put back an edge in the subgraph"""
+        self._own_ignored_edges().discard(edge)
+        self.invalidate()
+
+    def _own_ignored_edges(self) -> Set[int]:
+        """Ignored edges, copied when first modified as they may be shared"""
+        if not isinstance(self._ignored_edges, set):
+            self._ignored_edges = set(self._ignored_edges)
+        return self._ignored_edges
+
+    @property
+    def ignored_edges(self) -> MutableSet[int]:
+        """Edges not in the subgraph"""
+        return _IgnoredEdges(self)
+
+    @ignored_edges.setter
+    def ignored_edges(self, edges: AbstractSet[int]) -> None:
+        self._ignored_edges = set(edges)
+        self.invalidate()
+
+    @property
+    def ignore_categories(self) -> IgnoreMode:
+        """Which parents of categories are kept"""
+        return self._ignore_categories
+
+    @ignore_categories.setter
+    def ignore_categories(self, mode: IgnoreMode) -> None:
+        self._ignore_categories = mode
+        self.invalidate()
+
+    @property
+    def ignore_natural(self) -> IgnoreMode:
+        """Which parents of natural objects are kept"""
+        return self._ignore_natural
+
+    @ignore_natural.setter
+    def ignore_natural(self, mode: IgnoreMode) -> None:
+        self._ignore_natural = mode
+        self.invalidate()
+
+    @property
+    def ignore_others(self) -> IgnoreMode:
+        """Which parents of other objects are kept"""
+        return self._ignore_others
+
+    @ignore_others.setter
+    def ignore_others(self, mode: IgnoreMode) -> None:
+        self._ignore_others = mode
+        self.invalidate()
+
+    def settings(self) -> Settings:
+        """Tunable knobs of the subgraph, as a hashable value"""
+        return (self.max_distance, self.ignore_categories, self.ignore_natural,
+                self.ignore_others)
+
+    def apply_settings(self, settings: Settings) -> None:
+        """Set the knobs given by settings()"""
+        self.max_distance, self.ignore_categories, self.ignore_natural, \
+            self.ignore_others = settings
+
+    def _is_ignored(self, node: int) -> bool:
+        return node in self._ignored_nodes or (self._kept_nodes is not None and
+                                               node not in self._kept_nodes)
+
+    def keep_nodes(self, nodes: Set[int]) -> None:
+        """Ignore all nodes but the given ones, taking ownership of the set"""
+        if self._kept_nodes is not None:
+            nodes &= self._kept_nodes
+        self._kept_nodes = nodes
+        self.invalidate()
+
+    def nodes(self) -> Set[int]:
+        """Nodes in the subgraph"""
+        if self._kept_nodes is None:
+            return set(
+                i for i in range(self.graph.node_count())
+                if i not in self._ignored_nodes)
+        return self._kept_nodes - self._ignored_nodes
+
+    def _compute_proxy(self,
+                       nodes: Optional[Set[int]] = None) -> Dict[int, int]:
+        """Transition nodes with a single parent and child, replaced by it"""
+        if nodes is None:
+            nodes = self.nodes()
         proxy = {}  # type Dict[int, int]
-        for i, node in enumerate(self.graph._nodes):
-            if not isinstance(node, NodeObject):
-                if len(list(self._get_parents(i))) == 1:
-                    children = list(self._get_children(i))
+        for i in nodes:
+            # An ignored node has no children: it cannot be a parent
+            if self.graph.is_transition(i):
+                if len(self._get_parents(i)) == 1:
+                    children = self._get_children(i)
                     if len(children) == 1:
                         proxy[i] = children[0]
         return proxy
 
+    def iter_graphviz(self) -> Iterator[str]:
+        """Make a graphviz, one line after the other"""
+        nodes = self.nodes()
+        return self.graph.iter_graphviz(self.ignored_nodes,
+                                        self._ignored_edges,
+                                        self._compute_proxy(nodes), nodes)
+
+    def write_graphviz(self, out_file: TextIO) -> None:
+        """Write a graphviz to a file, without building it in memory"""
+        out_file.writelines(self.iter_graphviz())
+
     def to_graphviz(self) -> str:
         """Make a graphviz"""
-        return self.graph.to_graphviz(self.ignored_nodes, self.ignored_edges,
-                                      self._compute_proxy())
+        return ''.join(self.iter_graphviz())
 
     def leading_to_obj(self, obj: int) -> None:
         """Simplify graph: only have nodes and edges leading to obj node"""
-        self.ignored_edges.union(self._edges_ignored_by_no_parent_nodes())
-
         start = self.graph.obj_to_node[obj]
         visited = {start}
-        distances = [0 for _ in range(len(self.graph._nodes))]
+        distances = {start: 0}
         to_visit = {start}
         while to_visit:
             current = to_visit.pop()
@@ -83,63 +273,62 @@ class SubGraph():  # pylint: disable=protected-access
                     distances[parent] = distance + 1
                     to_visit.add(parent)
 
-        for i in range(len(self.graph._nodes)):
-            if i not in visited:
-                self.ignored_nodes.add(i)
+        self.keep_nodes(visited)
 
     def _get_ignore_type(self, node_index: int) -> IgnoreMode:
         """Get ignore mode of node"""
-        node = self.graph._nodes[node_index]
-        if not isinstance(node, NodeObject):
+        if self.graph.is_transition(node_index):
             return IgnoreMode.ALL_PARENTS
-        if node.complexity == 0:
+        if self.graph.complexity(node_index) == 0:
             return self.ignore_natural
-        if node.obj.is_category:
+        if self.graph.is_category(node_index):
             return self.ignore_categories
         return self.ignore_others
 
-    def _get_children(self, node: int) -> Iterator[int]:
+    def _get_children(self, node: int) -> Tuple[int, ...]:
         """Get children nodes in the subgraph"""
-        for edge_n in self.graph._out_edges[node]:
-            if edge_n in self.ignored_edges:
+        if node not in self._children:
+            self._children[node] = tuple(self._compute_children(node))
+        return self._children[node]
+
+    def _compute_children(self, node: int) -> Iterator[int]:
+        for child, edge_n in self.graph.get_out(node):
+            if edge_n in self._ignored_edges:
                 continue
-            child = self.graph._edges[edge_n].to_node
-            if child not in self.ignored_nodes:
+            if not self._is_ignored(child):
                 if node in self._get_parents(child):
                     yield child
 
     def _get_all_parents(self, node: int) -> Iterator[int]:
         """Get parents nodes in the subgraph, even if ignored by the node"""
-        for edge_n in self.graph._incoming_edges[node]:
-            if edge_n in self.ignored_edges:
+        for parent, edge_n in self.graph.get_in(node):
+            if edge_n in self._ignored_edges:
                 continue
-            parent = self.graph._edges[edge_n].from_node
-            if parent not in self.ignored_nodes:
+            if not self._is_ignored(parent):
                 yield parent
 
-    def _get_parents(self, node: int) -> Iterator[int]:
+    def _get_parents(self, node: int) -> Tuple[int, ...]:
         """Get parents nodes in the subgraph"""
+        if node not in self._parents:
+            self._parents[node] = tuple(self._compute_parents(node))
+        return self._parents[node]
+
+    def _compute_parents(self, node: int) -> Iterator[int]:
         mode = self._get_ignore_type(node)
         if mode in (IgnoreMode.NO_PARENTS, IgnoreMode.ONLY_EXISTING_PARENTS):
             pass
         elif mode == IgnoreMode.ALL_PARENTS:
-            for i in self._get_all_parents(node):
-                yield i
+            yield from self._get_all_parents(node)
         else:
             assert mode == IgnoreMode.LEAST_COMPLEX_PARENT
             parents = list(self._get_all_parents(node))
+            if not parents:
+                return
+            # Ties are broken by edge order, which an update may change
             chosen = parents[0]
-            complexity = self.graph._nodes[chosen].complexity
+            complexity = self.graph.complexity(chosen)
             for parent in parents:
-                if self.graph._nodes[parent].complexity < complexity:
+                if self.graph.complexity(parent) < complexity:
                     chosen = parent
-                    complexity = self.graph._nodes[chosen].complexity
+                    complexity = self.graph.complexity(chosen)
             yield chosen
-
-    def _edges_ignored_by_no_parent_nodes(self) -> Set[int]:
-        ignored_edges = set()  # type: Set[int]
-        for i in range(len(self.graph._nodes)):
-            if self._get_ignore_type(i) == IgnoreMode.NO_PARENTS:
-                for edge in self.graph._incoming_edges[i]:
-                    ignored_edges.add(edge)
-        return ignored_edges
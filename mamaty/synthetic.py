@@ -0,0 +1,157 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Random game data folders, to measure performance without the game"""
+
+import bisect
+import os
+import random
+from typing import List, Set, Tuple
+
+# Distance, in identifiers, between the inputs and outputs of a transition
+_WINDOW = 50
+
+
+def _write_object(root_folder: str, identifier: int, name: str,
+                  map_chance: float, death_marker: bool) -> None:
+    with open("{}/objects/{}.txt".format(root_folder, identifier), 'w') as out:
+        out.write("id={}\n{}\ncontainable=0\n".format(identifier, name))
+        out.write("mapChance={:.3f}#biomes_0\n".format(map_chance))
+        out.write("deathMarker={}\n".format(int(death_marker)))
+
+
+def _write_transition(root_folder: str, key: Tuple[int, int, str],
+                      outputs: Tuple[int, int], decay: int) -> None:
+    filename = "{}/transitions/{}_{}{}.txt".format(root_folder, *key)
+    with open(filename, 'w') as out:
+        out.write("{} {} {} 0.0 0.0 0 0 0 0\n".format(outputs[0], outputs[1],
+                                                      decay))
+
+
+def _write_category(root_folder: str, identifier: int,
+                    members: List[int]) -> None:
+    with open("{}/categories/{}.txt".format(root_folder, identifier),
+              'w') as out:
+        out.write("parentID={}\nnumObjects={}\n".format(
+            identifier, len(members)))
+        for member in members:
+            out.write("{}\n".format(member))
+
+
+def _write_objects(root_folder: str, identifiers: List[int], natural: Set[int],
+                   categories: Set[int]) -> None:
+    for i in identifiers:
+        name = "@Category {}".format(i) if i in categories \
+            else "Object {}".format(i)
+        _write_object(root_folder, i, name, 0.5 if i in natural and i % 2 else
+                      0., i in natural and not i % 2)
+    with open(root_folder + "/objects/nextObjectNumber.txt", 'w') as out:
+        out.write(str(len(identifiers) + 1))
+
+
+def _transition_key(rnd: random.Random,
+                    identifiers: List[int]) -> Tuple[int, int, str]:
+    """Actor, target and file name suffix of a random transition"""
+    object_count = len(identifiers)
+    target = rnd.choice(identifiers)
+    kind = rnd.random()
+    if kind < 0.1:
+        actor = -1  # Natural decay
+    elif kind < 0.3:
+        actor = 0  # Bare hands
+    elif kind < 0.35:
+        actor = -2  # Interaction
+    else:
+        actor = rnd.randint(
+            max(1, target - _WINDOW), min(object_count, target + _WINDOW))
+        if rnd.random() < 0.1:
+            target = -1  # Drop
+    suffix = rnd.choice(('', '', '', '_LA', '_LT')) if actor > 0 else ''
+    return actor, target, suffix
+
+
+def _write_transitions(root_folder: str, rnd: random.Random,
+                       identifiers: List[int], fan_out: float,
+                       cycle_density: float, products: List[int]) -> None:
+    def output(inputs: int) -> int:
+        """An object made from inputs of at most the given identifier"""
+        if rnd.random() < cycle_density:
+            return rnd.choice(products)
+        first = bisect.bisect_right(products, inputs)
+        if first == len(products):
+            return rnd.choice(products)
+        return products[rnd.randrange(first, min(
+            len(products), first + _WINDOW))]
+
+    keys = set()  # type: Set[Tuple[int, int, str]]
+    for _ in range(int(fan_out * len(identifiers))):
+        key = _transition_key(rnd, identifiers)
+        if key in keys:
+            continue
+        keys.add(key)
+        actor, target, _ = key
+
+        inputs = max(actor, target)
+        new_actor = 0
+        if actor > 0:
+            new_actor = rnd.choice((output(inputs), 0, actor))
+        new_target = rnd.choice((output(inputs), output(inputs), 0))
+        if target == -1:
+            new_target = output(inputs)
+        decay = rnd.choice((10, 60, -2)) if actor == -1 else 0
+        _write_transition(root_folder, key, (new_actor, new_target), decay)
+
+
+def generate_databank(root_folder: str,
+                      object_count: int = 1000,
+                      fan_out: float = 3.,
+                      fan_in: float = 2.,
+                      cycle_density: float = 0.05,
+                      category_count: int = 0,
+                      seed: int = 0) -> None:
+    """Write a game data folder with random objects, transitions and
+    categories, in the layout read by load_databank.
+    Objects are ordered like a tech tree: transitions mostly make objects
+    with greater identifiers than their inputs. fan_out is the average
+    number of transitions using an object, fan_in the average number of
+    transitions making an object, and cycle_density the share of outputs
+    taken anywhere, making cycles.
+    """
+    rnd = random.Random(seed)
+    for folder in ('objects', 'transitions', 'categories'):
+        os.makedirs(os.path.join(root_folder, folder), exist_ok=True)
+
+    identifiers = list(range(1, object_count + 1))
+    natural = set(rnd.sample(identifiers, object_count // 10))
+    categories = set(
+        rnd.sample([i for i in identifiers if i not in natural],
+                   min(category_count, object_count - len(natural))))
+    _write_objects(root_folder, identifiers, natural, categories)
+
+    # Objects made by transitions, so that each one has about fan_in makers
+    output_count = 1.5 * fan_out * object_count
+    products = sorted(i for i in identifiers
+                      if i not in natural and rnd.random() < output_count /
+                      (fan_in * (object_count - len(natural))))
+    if not products:
+        products = identifiers
+    _write_transitions(root_folder, rnd, identifiers, fan_out, cycle_density,
+                       products)
+
+    others = [i for i in identifiers if i not in categories]
+    for i in sorted(categories):
+        _write_category(root_folder, i, rnd.sample(others, min(3,
+                                                               len(others))))
@@ -0,0 +1,74 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Follow changes of the game data folder"""
+
+import time
+from typing import Dict, Iterator, List, Optional
+
+from mamaty.cache import scan_data_files
+from mamaty.databank import DatabankUpdate, Object, Transition
+from mamaty.databank import load_databank, update_databank
+from mamaty.graph import Graph
+
+
+class DatabankWatcher:
+    """Keep a databank and its graph up to date by polling the data folder"""
+
+    def __init__(self,
+                 root_folder: str,
+                 objects: Dict[int, Object],
+                 transitions: List[Transition],
+                 graph: Optional[Graph] = None) -> None:
+        self.root_folder = root_folder
+        self.objects = objects
+        self.transitions = transitions
+        self.graph = graph
+        self._files = scan_data_files(root_folder)
+
+    def changed_files(self) -> List[str]:
+        """Files added, modified or deleted since last call"""
+        files = scan_data_files(self.root_folder)
+        changed = [
+            path for path, stat in files.items()
+            if self._files.get(path) != stat
+        ]
+        changed.extend(path for path in self._files if path not in files)
+        self._files = files
+        return changed
+
+    def poll(self) -> DatabankUpdate:
+        """Apply changes of the data folder to the databank and the graph"""
+        update = update_databank(self.root_folder, self.objects,
+                                 self.transitions, self.changed_files())
+        if self.graph is not None:
+            self.graph.update(update)
+        return update
+
+    def watch(self, interval: float = 1.) -> Iterator[DatabankUpdate]:
+        """Poll forever, and give each non empty update"""
+        while True:
+            time.sleep(interval)
+            update = self.poll()
+            if update:
+                yield update
+
+
+def watch_databank_graph(root_folder: str) -> DatabankWatcher:
+    """Load the databank and its graph, and watch the data folder"""
+    objects, transitions = load_databank(root_folder)
+    return DatabankWatcher(root_folder, objects, transitions,
+                           Graph(objects, transitions))
@@ -17,17 +17,113 @@
 # along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
 """Parse One Hour One Life tech tree"""
 
+import argparse
 import sys
 
-from mamaty import load_databank_graph, Graph, SubGraph
+from mamaty import data_fingerprint, databank_loader, load_databank_graph
+from mamaty import BaseGraph, SubGraph
+from mamaty.compact import load_snapshot_graph
+from mamaty.names import NameIndex, load_or_build_names
+from mamaty.profiling import NO_PROFILER, Profiler
 
 
-def graphviz(graph: Graph, object_: int) -> str:
-    """Print graphviz leading to object"""
+def leading_to(graph: BaseGraph, object_: int) -> SubGraph:
+    """Subgraph leading to object"""
     subgraph = SubGraph(graph)
     subgraph.leading_to_obj(object_)
-    return subgraph.to_graphviz()
+    return subgraph
+
+
+def graphviz(graph: BaseGraph, object_: int) -> str:
+    """Print graphviz leading to object"""
+    return leading_to(graph, object_).to_graphviz()
+
+
+def resolve(graph: BaseGraph, query: str, names_file: str, folder: str) -> int:
+    """Object identified by query, an identifier or a name.
+    Exit listing candidates if the name is unknown or ambiguous.
+    """
+    if query.isdigit():
+        return int(query)
+    if names_file:
+        names = load_or_build_names(names_file, graph,
+                                    data_fingerprint(folder))
+    else:
+        names = NameIndex.from_graph(graph)
+    object_ = names.resolve(query)
+    if object_ is None:
+        candidates = names.search(query)
+        count = 'Several' if candidates else 'No'
+        print("{} objects match '{}'".format(count, query), file=sys.stderr)
+        for identifier, name in names.describe(candidates):
+            print("{:>6} {}".format(identifier, name), file=sys.stderr)
+        sys.exit(1)
+    return object_
+
+
+def load_graph(args: argparse.Namespace, profiler: Profiler) -> BaseGraph:
+    """Graph of the game data, as asked by command line arguments"""
+    if args.snapshot:
+        return load_snapshot_graph(args.folder, args.snapshot, args.workers,
+                                   profiler, args.cache)
+    return load_databank_graph(args.folder, args.workers, profiler,
+                               databank_loader(args.cache, args.lazy))
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('folder', help="game data folder")
+    parser.add_argument('object', help="object identifier or name")
+    parser.add_argument(
+        '--cache',
+        metavar='FILE',
+        help="compiled databank cache, rebuilt when the game data changes")
+    parser.add_argument(
+        '--snapshot',
+        metavar='FILE',
+        help="snapshot of the computed graph, made again when the game data "
+        "changes")
+    parser.add_argument(
+        '--lazy',
+        metavar='FILE',
+        help="only read object files when needed, keeping their natural "
+        "status in this index file")
+    parser.add_argument(
+        '--names',
+        metavar='FILE',
+        help="index of object names, rebuilt when the game data changes")
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help="number of processes used to parse the game data")
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help="print time used by each phase on standard error")
+    parser.add_argument(
+        '--profile-memory',
+        action='store_true',
+        help="also trace memory used by each phase, which is much slower")
+    args = parser.parse_args()
+    if args.lazy and args.snapshot:
+        parser.error("--lazy cannot be used with --snapshot, which does not "
+                     "read object files once saved")
+    return args
 
 
 if __name__ == '__main__':
-    print(graphviz(load_databank_graph(sys.argv[1]), int(sys.argv[2])))
+    ARGS = parse_args()
+    PROFILER = Profiler(ARGS.profile_memory) \
+        if ARGS.profile or ARGS.profile_memory else NO_PROFILER
+    GRAPH = load_graph(ARGS, PROFILER)
+    with PROFILER.phase('names'):
+        OBJECT = resolve(GRAPH, ARGS.object, ARGS.names, ARGS.folder)
+    with PROFILER.phase('leading_to'):
+        SUBGRAPH = leading_to(GRAPH, OBJECT)
+    with PROFILER.phase('graphviz'):
+        SUBGRAPH.write_graphviz(sys.stdout)
+        print()
+    if PROFILER is not NO_PROFILER:
+        print(PROFILER.report(), file=sys.stderr)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Render One Hour One Life tech tree graphs of many objects"""
+
+import argparse
+import os
+from typing import List
+
+from mamaty import databank_loader, load_databank_graph, BaseGraph
+from mamaty.batch import reachable_objects, render_objects
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('folder', help="game data folder")
+    parser.add_argument('output', help="folder where to write images")
+    parser.add_argument(
+        'objects',
+        nargs='*',
+        type=int,
+        help="object identifiers, all reachable objects if none given")
+    parser.add_argument(
+        '--range',
+        nargs=2,
+        type=int,
+        metavar=('FIRST', 'LAST'),
+        help="render objects from FIRST to LAST included")
+    parser.add_argument(
+        '--format', default='png', help="output format given to dot")
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=os.cpu_count(),
+        help="number of processes computing graphs")
+    parser.add_argument(
+        '--dot-workers',
+        type=int,
+        default=os.cpu_count(),
+        help="number of dot processes running at once")
+    parser.add_argument(
+        '--cache',
+        metavar='FILE',
+        help="compiled databank cache, rebuilt when the game data changes")
+    parser.add_argument(
+        '--shared',
+        metavar='FILE',
+        help="memory-mapped file through which processes share the graph")
+    return parser.parse_args()
+
+
+def object_list(graph: BaseGraph, args: argparse.Namespace) -> List[int]:
+    """Objects to render, among existing ones"""
+    objects = list(args.objects)
+    if args.range is not None:
+        objects.extend(range(args.range[0], args.range[1] + 1))
+    if not objects:
+        return reachable_objects(graph)
+    return [i for i in objects if i in graph.obj_to_node]
+
+
+if __name__ == '__main__':
+    ARGS = parse_args()
+    GRAPH = load_databank_graph(
+        ARGS.folder, loader=databank_loader(ARGS.cache))
+    os.makedirs(ARGS.output, exist_ok=True)
+    render_objects(
+        GRAPH,
+        object_list(GRAPH, ARGS),
+        os.path.join(ARGS.output, '{}.' + ARGS.format),
+        ARGS.processes,
+        ARGS.dot_workers,
+        ARGS.format,
+        shared_file=ARGS.shared)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Serve One Hour One Life tech tree graphs over HTTP"""
+
+import argparse
+
+from mamaty import data_fingerprint, databank_loader, load_databank_graph
+from mamaty import BaseGraph, load_or_build_index
+from mamaty.compact import load_snapshot_graph
+from mamaty.names import load_or_build_names
+from mamaty.server import GraphServer
+
+
+def load_graph(args: argparse.Namespace) -> BaseGraph:
+    """Graph of the game data, as asked by command line arguments"""
+    if args.snapshot:
+        return load_snapshot_graph(
+            args.folder, args.snapshot, args.workers, cache_file=args.cache)
+    return load_databank_graph(
+        args.folder, args.workers, loader=databank_loader(args.cache))
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('folder', help="game data folder")
+    parser.add_argument(
+        '--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument(
+        '--port', type=int, default=8000, help="port to listen on")
+    parser.add_argument(
+        '--cache',
+        metavar='FILE',
+        help="compiled databank cache, rebuilt when the game data changes")
+    parser.add_argument(
+        '--snapshot',
+        metavar='FILE',
+        help="snapshot of the computed graph, made again when the game data "
+        "changes")
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help="number of processes used to parse the game data")
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=64,
+        help="memory used to cache graphs, in MiB")
+    parser.add_argument(
+        '--index',
+        metavar='FILE',
+        help="precomputed ancestor index, rebuilt when the game data changes")
+    parser.add_argument(
+        '--names',
+        metavar='FILE',
+        help="index of object names, rebuilt when the game data changes")
+    parser.add_argument(
+        '--threads',
+        type=int,
+        default=8,
+        help="number of threads answering requests")
+    parser.add_argument(
+        '--verbose', action='store_true', help="log each request")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    ARGS = parse_args()
+    GRAPH = load_graph(ARGS)
+    ancestor_index = None
+    if ARGS.index:
+        ancestor_index = load_or_build_index(ARGS.index, GRAPH,
+                                             data_fingerprint(ARGS.folder))
+    name_index = None
+    if ARGS.names:
+        name_index = load_or_build_names(ARGS.names, GRAPH,
+                                         data_fingerprint(ARGS.folder))
+    SERVER = GraphServer((ARGS.host, ARGS.port), GRAPH, ARGS.verbose,
+                         ARGS.cache_size * 1024 * 1024, ancestor_index,
+                         name_index, ARGS.threads)
+    try:
+        SERVER.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        SERVER.server_close()
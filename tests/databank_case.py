@@ -0,0 +1,90 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Small generated game data folder, shared by the tests"""
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from typing import Dict, List, Optional
+
+from mamaty import BaseGraph, SubGraph
+from mamaty.subgraph import Settings
+from mamaty.synthetic import generate_databank
+
+
+def leading_to(graph: BaseGraph,
+               object_: int,
+               settings: Optional[Settings] = None) -> List[str]:
+    """Graphviz lines of the subgraph leading to object"""
+    subgraph = SubGraph(graph)
+    if settings is not None:
+        subgraph.apply_settings(settings)
+    subgraph.leading_to_obj(object_)
+    return subgraph.to_graphviz().splitlines()
+
+
+def object_complexities(graph: BaseGraph) -> Dict[int, int]:
+    """Complexity of every reachable object"""
+    return {
+        identifier: graph.complexity(node)
+        for identifier, node in graph.obj_to_node.items()
+        if identifier not in graph.unreachable
+    }
+
+
+class DatabankTestCase(unittest.TestCase):
+    """Generated game data folder, shared by the tests of the class"""
+
+    tmp_folder = ''
+    root_folder = ''
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        logging.disable(logging.WARNING)
+        cls.tmp_folder = tempfile.mkdtemp()
+        cls.root_folder = os.path.join(cls.tmp_folder, 'data')
+        generate_databank(
+            cls.root_folder, object_count=200, category_count=10, seed=1)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.tmp_folder)
+        logging.disable(logging.NOTSET)
+
+    def data_file(self, path: str) -> str:
+        """Path of a file of the game data folder"""
+        return os.path.join(self.root_folder, path)
+
+    def write(self, path: str, content: str) -> None:
+        """Replace a file of the game data folder"""
+        with open(self.data_file(path), 'w') as out_file:
+            out_file.write(content)
+
+    def assert_same_graph(self, graph: BaseGraph, expected: BaseGraph) -> None:
+        """Same complexities, loops, and graphviz for every object"""
+        self.assertEqual(
+            object_complexities(graph), object_complexities(expected))
+        self.assertEqual(set(graph.unreachable), set(expected.unreachable))
+        self.assertEqual(graph.edge_count(), expected.edge_count())
+        self.assertEqual(set(graph.looping_edges), set(expected.looping_edges))
+        for identifier in sorted(expected.obj_to_node):
+            if identifier not in expected.unreachable:
+                self.assertEqual(
+                    leading_to(graph, identifier),
+                    leading_to(expected, identifier), identifier)
@@ -0,0 +1,100 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Index of the ancestors of every node"""
+
+import os
+import unittest
+from typing import Optional, Set
+
+from mamaty import AncestorIndex, BaseGraph, SubGraph, load_databank_graph
+from mamaty import load_or_build_index
+from mamaty.subgraph import IgnoreMode, Settings
+
+from databank_case import DatabankTestCase, leading_to
+
+
+def ancestors(graph: BaseGraph, node: int,
+              settings: Optional[Settings] = None) -> Set[int]:
+    """Nodes leading to node, by a traversal of the SubGraph parents"""
+    # pylint: disable=protected-access
+    subgraph = SubGraph(graph)
+    if settings is not None:
+        subgraph.apply_settings(settings)
+    found = {node}
+    to_visit = [node]
+    while to_visit:
+        for parent in subgraph._get_parents(to_visit.pop()):
+            if parent not in found:
+                found.add(parent)
+                to_visit.append(parent)
+    return found
+
+
+class AncestorIndexTest(DatabankTestCase):
+    """Ancestors from the index are those of a traversal"""
+
+    def setUp(self) -> None:
+        self.graph = load_databank_graph(self.root_folder)
+
+    def assert_ancestors(self,
+                         index: AncestorIndex,
+                         settings: Optional[Settings] = None) -> None:
+        """Compare ancestors_of and leads_to with a traversal"""
+        nodes = range(self.graph.node_count())
+        for node in nodes:
+            expected = ancestors(self.graph, node, settings)
+            self.assertEqual(index.ancestors_of(node), expected, node)
+            for other in nodes[::7]:
+                leads_to = other in expected
+                self.assertEqual(
+                    index.leads_to(other, node), leads_to, (other, node))
+
+    def test_default(self) -> None:
+        """Least complex parent"""
+        self.assert_ancestors(AncestorIndex(self.graph))
+
+    def test_all_parents(self) -> None:
+        """All parents, cycles included"""
+        settings = (0, IgnoreMode.ALL_PARENTS, IgnoreMode.ALL_PARENTS,
+                    IgnoreMode.ALL_PARENTS)
+        self.assert_ancestors(AncestorIndex(self.graph, settings), settings)
+
+    def test_saved(self) -> None:
+        """Index loaded back from its file"""
+        filename = os.path.join(self.tmp_folder, 'ancestors')
+        built = load_or_build_index(filename, self.graph, 'data')
+        loaded = AncestorIndex.load(filename, self.graph, 'data')
+        assert loaded is not None
+        self.assertEqual(loaded.run_offsets, built.run_offsets)
+        self.assertEqual(loaded.runs, built.runs)
+        self.assertIsNone(AncestorIndex.load(filename, self.graph, 'other'))
+        self.assert_ancestors(loaded)
+
+    def test_leading_to_obj(self) -> None:
+        """Subgraph from the index"""
+        index = AncestorIndex(self.graph)
+        for identifier in sorted(self.graph.obj_to_node)[::5]:
+            if identifier in self.graph.unreachable:
+                continue
+            subgraph = SubGraph(self.graph)
+            index.leading_to_obj(subgraph, identifier)
+            self.assertEqual(subgraph.to_graphviz().splitlines(),
+                             leading_to(self.graph, identifier), identifier)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Rendering of the graphs of many objects"""
+
+import io
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import unittest
+from typing import List, Optional
+
+from mamaty import load_databank_graph
+from mamaty.batch import reachable_objects, render_objects
+
+from databank_case import DatabankTestCase, leading_to
+
+# Stands for dot, copying the graphviz read to the -o file
+_FAKE_DOT = '''#!{}
+import sys
+with open(sys.argv[2][2:], 'w') as out_file:
+    out_file.write(sys.stdin.read())
+'''
+
+
+class RenderTest(DatabankTestCase):
+    """Rendered files have the graphviz of SubGraph"""
+
+    def setUp(self) -> None:
+        self.graph = load_databank_graph(self.root_folder)
+        self.files = tempfile.mkdtemp()
+        self.dot = os.path.join(self.files, 'dot')
+        with open(self.dot, 'w') as out_file:
+            out_file.write(_FAKE_DOT.format(sys.executable))
+        os.chmod(self.dot, os.stat(self.dot).st_mode | stat.S_IEXEC)
+        self.objects = reachable_objects(self.graph)[::5]
+        self.pattern = os.path.join(self.files, '{}.dot')
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.files)
+
+    def render(self,
+               processes: int,
+               dot_workers: int = 1,
+               shared_file: Optional[str] = None) -> List[str]:
+        """Render the objects, and return the progress lines"""
+        progress = io.StringIO()
+        render_objects(
+            self.graph,
+            self.objects,
+            self.pattern,
+            processes,
+            dot_workers,
+            dot=self.dot,
+            progress=progress,
+            shared_file=shared_file)
+        return progress.getvalue().splitlines()
+
+    def assert_rendered(self) -> None:
+        """Every object rendered with its graphviz"""
+        for identifier in self.objects:
+            with open(self.pattern.format(identifier)) as in_file:
+                self.assertEqual(in_file.read().splitlines(),
+                                 leading_to(self.graph, identifier),
+                                 identifier)
+
+    def test_reachable_objects(self) -> None:
+        """Objects that can be made"""
+        self.assertEqual(
+            set(reachable_objects(self.graph)),
+            set(self.graph.obj_to_node) - set(self.graph.unreachable))
+
+    def test_processes(self) -> None:
+        """Graphs computed by a pool of processes"""
+        lines = self.render(2, 2)
+        self.assertEqual(len(lines), len(self.objects))
+        self.assert_rendered()
+
+    def test_shared_file(self) -> None:
+        """Graph shared with the processes through a file"""
+        self.render(2, shared_file=os.path.join(self.files, 'shared'))
+        self.assert_rendered()
+
+    def test_dot_failure(self) -> None:
+        """Each failure reported, and the first one raised at the end"""
+        progress = io.StringIO()
+        with self.assertRaises(subprocess.CalledProcessError):
+            render_objects(
+                self.graph,
+                self.objects,
+                self.pattern,
+                dot='false',
+                progress=progress)
+        lines = progress.getvalue().splitlines()
+        self.assertEqual(len(lines), len(self.objects))
+        self.assertTrue(all('dot failed' in line for line in lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Compiled cache of the game data folder"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from typing import List
+
+from mamaty import Profiler, databank_loader, load_databank_graph
+
+from databank_case import DatabankTestCase
+
+
+def phase_names(profiler: Profiler) -> List[str]:
+    """Names of the recorded phases"""
+    return [phase.name for phase in profiler.phases]
+
+
+class CacheTest(DatabankTestCase):
+    """Graph read through the cache is the normal graph"""
+
+    def setUp(self) -> None:
+        self.expected = load_databank_graph(self.root_folder)
+        self.files = tempfile.mkdtemp()
+        self.loader = databank_loader(
+            cache_file=os.path.join(self.files, 'cache'))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.files)
+
+    def load(self) -> List[str]:
+        """Load the graph through the cache, and compare it"""
+        profiler = Profiler()
+        graph = load_databank_graph(
+            self.root_folder, profiler=profiler, loader=self.loader)
+        self.assert_same_graph(graph, self.expected)
+        return phase_names(profiler)
+
+    def test_cache(self) -> None:
+        """Built, then read from the cache file"""
+        self.assertIn('write cache', self.load())
+        phases = self.load()
+        self.assertIn('columns', phases)
+        self.assertNotIn('write cache', phases)
+
+    def test_modified(self) -> None:
+        """Built again when a data file changes"""
+        self.load()
+        path = 'objects/57.txt'
+        with open(self.data_file(path)) as in_file:
+            content = in_file.read()
+        try:
+            self.write(path, content.replace('Object 57', 'Modified 57'))
+            profiler = Profiler()
+            graph = load_databank_graph(
+                self.root_folder, profiler=profiler, loader=self.loader)
+            self.assertIn('write cache', phase_names(profiler))
+            self.assertEqual(
+                graph.object_name(graph.obj_to_node[57]), 'Modified 57')
+        finally:
+            self.write(path, content)
+        self.assertIn('write cache', self.load())
+
+
+if __name__ == '__main__':
+    unittest.main()
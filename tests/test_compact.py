@@ -0,0 +1,59 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Read-only graph kept in flat arrays"""
+
+import unittest
+
+from mamaty import CompactGraph, load_databank_graph
+from mamaty.cache import databank_to_columns
+
+from databank_case import DatabankTestCase
+
+
+class CompactGraphTest(DatabankTestCase):
+    """Compact graphs are the normal graph"""
+
+    def setUp(self) -> None:
+        self.graph = load_databank_graph(self.root_folder)
+        self.computed = CompactGraph.from_columns(
+            databank_to_columns(*self.graph.databank()))
+
+    def test_from_columns(self) -> None:
+        """Computed from the databank columns"""
+        self.assert_same_graph(self.computed, self.graph)
+        for node in range(self.graph.node_count()):
+            self.assertEqual(
+                sorted(self.computed.get_in(node)),
+                sorted(self.graph.get_in(node)), node)
+            self.assertEqual(
+                sorted(self.computed.get_out(node)),
+                sorted(self.graph.get_out(node)), node)
+
+    def test_from_graph(self) -> None:
+        """Copied from a graph, with the same arrays as when computed"""
+        copied = CompactGraph.from_graph(self.graph)
+        self.assertEqual(
+            {name: list(values)
+             for name, values in copied.arrays().items()}, {
+                 name: list(values)
+                 for name, values in self.computed.arrays().items()
+             })
+        self.assert_same_graph(copied, self.graph)
+
+
+if __name__ == '__main__':
+    unittest.main()
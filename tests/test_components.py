@@ -0,0 +1,100 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Strongly connected components, without recursion"""
+
+import sys
+import unittest
+from typing import Dict, List, Set
+
+from mamaty import Graph, Object, Transition
+from mamaty.components import component_members
+from mamaty.components import strongly_connected_components
+
+# Longer than any recursion would allow
+_DEPTH = 5 * sys.getrecursionlimit()
+
+
+def reachable(children: List[List[int]], node: int) -> Set[int]:
+    """Nodes reachable from node, including itself"""
+    found = {node}
+    to_visit = [node]
+    while to_visit:
+        for child in children[to_visit.pop()]:
+            if child not in found:
+                found.add(child)
+                to_visit.append(child)
+    return found
+
+
+class ComponentsTest(unittest.TestCase):
+    """Components of small graphs and deep chains"""
+
+    def test_small(self) -> None:
+        """Same components as mutual reachability, in reverse topological
+        order
+        """
+        children = [[1], [2, 3], [0], [4], [5, 6], [3], [], [6, 0]]
+        scc = strongly_connected_components(
+            len(children), children.__getitem__)
+        reach = [reachable(children, node) for node in range(len(children))]
+        for node in range(len(children)):
+            for other in range(len(children)):
+                self.assertEqual(scc[node] == scc[other], node in reach[other]
+                                 and other in reach[node], (node, other))
+            for child in children[node]:
+                self.assertLessEqual(scc[child], scc[node])
+        self.assertEqual(
+            sorted(map(sorted, component_members(scc))),
+            [[0, 1, 2], [3, 4, 5], [6], [7]])
+
+    def test_roots(self) -> None:
+        """Only nodes reachable from the roots"""
+        children = [[1], [], [0], [3]]
+        scc = strongly_connected_components(
+            len(children), children.__getitem__, [1, 0])
+        self.assertEqual(scc, [1, 0, -1, -1])
+
+    def test_deep_chain(self) -> None:
+        """A chain, each node alone in its component"""
+        scc = strongly_connected_components(
+            _DEPTH, lambda node: [node + 1] if node + 1 < _DEPTH else [])
+        self.assertEqual(scc, list(range(_DEPTH - 1, -1, -1)))
+
+    def test_deep_cycle(self) -> None:
+        """A cycle, all in a single component"""
+        scc = strongly_connected_components(_DEPTH,
+                                            lambda node: [(node + 1) % _DEPTH])
+        self.assertEqual(set(scc), {0})
+
+    def test_deep_graph(self) -> None:
+        """Graph of a chain of transitions, closed by a loop"""
+        objects = {0: Object(0, "Bare Hands", True)}  # type: Dict[int, Object]
+        for i in range(1, _DEPTH + 1):
+            objects[i] = Object(i, "Object {}".format(i), i == 1)
+        transitions = [Transition(0, i, 0, i + 1) for i in range(1, _DEPTH)]
+        transitions.append(Transition(0, _DEPTH, 0, 1))
+        for transition in transitions:
+            transition.add_to_objects(objects)
+        graph = Graph(objects, transitions)
+        self.assertEqual(set(graph.scc), {0})
+        self.assertEqual(
+            graph.complexity(graph.obj_to_node[_DEPTH]), _DEPTH - 1)
+        self.assertEqual(len(graph.looping_edges), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Parsing of the game data folder"""
+
+import os
+import unittest
+from typing import Any, List, Tuple
+
+from mamaty import Transition, load_databank
+from mamaty.databank import TRANSITION_COLUMNS, read_transition_columns
+
+from databank_case import DatabankTestCase
+
+
+def values(transitions: List[Transition]) -> List[Tuple[Any, ...]]:
+    """Sorted attributes of transitions"""
+    return sorted(
+        tuple(getattr(transition, name) for name in TRANSITION_COLUMNS)
+        for transition in transitions)
+
+
+class TransitionTest(DatabankTestCase):
+    """Transition files parsed one by one, or into columns"""
+
+    def test_from_file(self) -> None:
+        """Flags and fractions of a transition file"""
+        self.write('transitions/12_34_LA.txt', '56 78 0 0.5 0.0 1 300 2 3\n')
+        folder = self.data_file('transitions')
+        transition = Transition.from_file(folder, '12_34_LA.txt')
+        os.remove(self.data_file('transitions/12_34_LA.txt'))
+        self.assertEqual(
+            (transition.actor, transition.target, transition.new_actor,
+             transition.new_target, transition.last_use_actor,
+             transition.last_use_target), (12, 34, 56, 78, True, False))
+        self.assertEqual(transition.actor_min_use_fraction, 0.5)
+        self.assertTrue(transition.reverse_use_actor_flag)
+        self.assertFalse(transition.reverse_use_target_flag)
+        self.assertEqual((transition.move, transition.desired_move_dist),
+                         (2, 3))
+
+    def test_parse_all(self) -> None:
+        """Same transitions as a full load, with or without workers"""
+        folder = self.data_file('transitions')
+        expected = values(load_databank(self.root_folder)[1])
+        self.assertEqual(values(list(Transition.parse_all(folder))), expected)
+        self.assertEqual(
+            values(list(Transition.parse_all(folder, workers=2))), expected)
+        self.assertEqual(
+            len(read_transition_columns(folder)['actor']), len(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Objects reachable from held objects"""
+
+import unittest
+
+from mamaty import ForwardReachability, Graph, load_databank
+from mamaty import load_databank_graph
+
+from databank_case import DatabankTestCase, object_complexities
+
+
+class ForwardReachabilityTest(DatabankTestCase):
+    """Forward reachability agrees with the complexities of the graph"""
+
+    def test_baseline(self) -> None:
+        """Only natural objects held"""
+        graph = load_databank_graph(self.root_folder)
+        reachable = ForwardReachability(graph).from_inventory([])
+        self.assertEqual(reachable.reachable(), object_complexities(graph))
+        self.assertEqual(reachable.improved(), {})
+
+    def test_inventory(self) -> None:
+        """Held objects are the same as natural ones"""
+        objects, transitions = load_databank(self.root_folder)
+        graph = Graph(objects, transitions)
+        forward = ForwardReachability(graph)
+        inventory = [
+            i for i in sorted(objects)[1::25] if not objects[i].is_natural
+        ]
+        reachable = forward.from_inventory(inventory)
+        for identifier in inventory:
+            objects[identifier].is_natural = True
+        expected = object_complexities(Graph(objects, transitions))
+        self.assertEqual(reachable.reachable(), expected)
+        self.assertEqual(
+            reachable.newly_reachable(),
+            sorted(set(expected) - set(object_complexities(graph))))
+        for identifier, complexity in reachable.improved().items():
+            self.assertEqual(complexity, expected[identifier])
+
+    def test_inventories(self) -> None:
+        """Growing inventories, each one starting from the previous one"""
+        objects, transitions = load_databank(self.root_folder)
+        forward = ForwardReachability(Graph(objects, transitions))
+        held = [i for i in sorted(objects) if not objects[i].is_natural]
+        inventories = [frozenset(held[:count]) for count in (3, 6, 6, 12)]
+        for inventory, reachable in zip(inventories,
+                                        forward.from_inventories(inventories)):
+            self.assertEqual(reachable.inventory, inventory)
+            self.assertEqual(reachable.reachable(),
+                             forward.from_inventory(inventory).reachable())
+
+    def test_modified_graph(self) -> None:
+        """Results of a graph modified since are refused"""
+        graph = load_databank_graph(self.root_folder)
+        forward = ForwardReachability(graph)
+        reachable = forward.from_inventory([])
+        graph.version += 1
+        self.assertFalse(reachable.is_current())
+        with self.assertRaises(ValueError):
+            reachable.add([42])
+        self.assertEqual(
+            forward.from_inventory([]).reachable(), object_complexities(graph))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Objects read lazily, with an index of their natural status"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mamaty import databank_loader, load_databank, load_databank_graph
+from mamaty import load_lazy_databank
+from mamaty.databank import LazyObject
+
+from databank_case import DatabankTestCase
+
+
+class LazyTest(DatabankTestCase):
+    """Lazy objects give the normal graph"""
+
+    def setUp(self) -> None:
+        self.files = tempfile.mkdtemp()
+        self.index_file = os.path.join(self.files, 'index')
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.files)
+
+    def test_objects(self) -> None:
+        """Objects read, then taken from the index until their name is
+        needed
+        """
+        expected = load_databank(self.root_folder)[0]
+        for lazy in (False, True):
+            objects = load_lazy_databank(self.root_folder, self.index_file)[0]
+            self.assertEqual(list(objects), list(expected))
+            for identifier, obj in objects.items():
+                self.assertEqual(
+                    isinstance(obj, LazyObject), lazy and identifier != 0)
+                self.assertEqual(obj.is_natural,
+                                 expected[identifier].is_natural)
+                self.assertEqual(obj.name, expected[identifier].name)
+
+    def test_modified(self) -> None:
+        """Object read again when its file changes"""
+        load_lazy_databank(self.root_folder, self.index_file)
+        path = 'objects/57.txt'
+        with open(self.data_file(path)) as in_file:
+            content = in_file.read()
+        try:
+            self.write(path, content.replace('Object 57', 'Modified 57'))
+            objects = load_lazy_databank(self.root_folder, self.index_file)[0]
+            self.assertNotIsInstance(objects[57], LazyObject)
+            self.assertEqual(objects[57].name, 'Modified 57')
+        finally:
+            self.write(path, content)
+
+    def test_graph(self) -> None:
+        """Same graph, with objects in the same order"""
+        expected = load_databank_graph(self.root_folder)
+        loader = databank_loader(lazy_index_file=self.index_file)
+        for _ in range(2):
+            graph = load_databank_graph(self.root_folder, loader=loader)
+            self.assertEqual(
+                list(graph.obj_to_node), list(expected.obj_to_node))
+            self.assert_same_graph(graph, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
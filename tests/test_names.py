@@ -0,0 +1,91 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Index of object names"""
+
+import os
+import unittest
+
+from mamaty import NameIndex, load_databank, load_databank_graph
+from mamaty import load_or_build_names
+
+from databank_case import DatabankTestCase
+
+
+class NameIndexTest(DatabankTestCase):
+    """Objects found by identifier, name, prefix, words and category"""
+
+    def setUp(self) -> None:
+        self.objects = load_databank(self.root_folder)[0]
+        self.index = NameIndex(self.objects.values())
+        self.category = self.objects[min(
+            identifier for identifier, obj in self.objects.items()
+            if obj.is_category)]
+
+    def test_empty(self) -> None:
+        """Empty queries match nothing"""
+        for query in ('', ' ', '\t\n'):
+            self.assertEqual(self.index.search(query), [], repr(query))
+            self.assertIsNone(self.index.resolve(query), repr(query))
+
+    def test_search(self) -> None:
+        """Identifier, exact name, prefix, words and close names"""
+        self.assertEqual(self.index.search('42'), [42])
+        self.assertEqual(self.index.search('9999'), [])
+        self.assertEqual(self.index.search(' object  42 '), [42])
+        self.assertEqual(self.index.search('Obj', 3), [10, 100, 101])
+        self.assertEqual(self.index.search('42 object'), [42])
+        self.assertEqual(self.index.search('Objetc 42', 1), [42])
+        self.assertEqual(self.index.resolve('Object 42'), 42)
+        self.assertIsNone(self.index.resolve('Obj'))
+
+    def test_category(self) -> None:
+        """Objects contained by a category, or the category itself"""
+        contained = sorted(
+            i.identifier for i in self.category.category_contains)
+        name = self.category.name
+        self.assertTrue(name.startswith('@'))
+        self.assertEqual(self.index.search(name), contained)
+        self.assertEqual(self.index.search(name.upper(), 1), contained[:1])
+        self.assertEqual(self.index.category(name), contained)
+        self.assertEqual(self.index.resolve(name), self.category.identifier)
+
+    def test_saved(self) -> None:
+        """Index of the graph, loaded back from its file"""
+        filename = os.path.join(self.tmp_folder, 'names')
+        graph = load_databank_graph(self.root_folder)
+        built = load_or_build_names(filename, graph, 'data')
+        loaded = NameIndex.load(filename, 'data')
+        assert loaded is not None
+        self.assertIsNone(NameIndex.load(filename, 'other'))
+        self.assertEqual(loaded.names, built.names)
+        self.assertEqual(loaded.categories, built.categories)
+        # Objects missing from the graph, such as bare hands, are not named
+        self.assertEqual(
+            built.names, {
+                identifier: name
+                for identifier, name in self.index.names.items()
+                if identifier in graph.obj_to_node
+            })
+        for index in (built, loaded):
+            self.assertEqual(index.categories, self.index.categories)
+            self.assertEqual(
+                index.search(self.category.name),
+                self.index.search(self.category.name))
+
+
+if __name__ == '__main__':
+    unittest.main()
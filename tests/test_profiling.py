@@ -0,0 +1,75 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Time and memory used by each phase"""
+
+import tracemalloc
+import unittest
+from typing import Dict
+
+from mamaty import Profiler, load_databank_graph
+from mamaty.profiling import NO_PROFILER
+
+from databank_case import DatabankTestCase
+
+
+class ProfilerTest(DatabankTestCase):
+    """Phases recorded while loading a graph"""
+
+    def test_phases(self) -> None:
+        """Nested phases, in order, with their counts"""
+        profiler = Profiler()
+        graph = load_databank_graph(self.root_folder, profiler=profiler)
+        names = [phase.name for phase in profiler.phases]
+        self.assertEqual(
+            [phase.name for phase in profiler.phases if not phase.depth],
+            ['databank', 'graph'])
+        self.assertGreater(len(names), 2)
+        self.assertTrue(all(phase.seconds >= 0 for phase in profiler.phases))
+        counts = {}  # type: Dict[str, int]
+        for phase in profiler.phases:
+            counts.update(phase.counts)
+        self.assertIn(graph.node_count(), counts.values())
+        self.assertEqual([phase['name'] for phase in profiler.as_dicts()],
+                         names)
+        self.assertEqual(len(profiler.report().splitlines()), len(names))
+
+    def test_memory(self) -> None:
+        """Peak of memory allocated in each phase, including nested ones"""
+        profiler = Profiler(memory=True)
+        try:
+            with profiler.phase('outer') as outer:
+                with profiler.phase('inner') as inner:
+                    data = [[i] for i in range(10000)]
+                del data
+        finally:
+            tracemalloc.stop()
+        assert outer.memory is not None and inner.memory is not None
+        self.assertGreater(inner.memory, 10000 * 8)
+        self.assertGreaterEqual(outer.memory, inner.memory)
+        self.assertIn('MiB', profiler.report())
+
+    def test_disabled(self) -> None:
+        """Nothing recorded without a profiler"""
+        load_databank_graph(self.root_folder)
+        self.assertEqual(NO_PROFILER.phases, [])
+        with NO_PROFILER.phase('phase') as phase:
+            phase.counts['nodes'] = 1
+        self.assertEqual(phase.counts, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
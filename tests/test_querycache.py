@@ -0,0 +1,107 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Cache of subgraphs leading to objects"""
+
+import unittest
+from typing import List
+
+from mamaty import AncestorIndex, SubGraphCache, load_databank_graph
+from mamaty.subgraph import IgnoreMode
+
+from databank_case import DatabankTestCase, leading_to
+
+
+class SubGraphCacheTest(DatabankTestCase):
+    """Cached subgraphs are those of SubGraph"""
+
+    def setUp(self) -> None:
+        self.graph = load_databank_graph(self.root_folder)
+        self.objects = [
+            identifier for identifier in sorted(self.graph.obj_to_node)
+            if identifier not in self.graph.unreachable
+        ][::4]
+
+    def graphviz(self, cache: SubGraphCache) -> List[List[str]]:
+        """Graphviz lines of every queried object, from the cache"""
+        return [
+            cache.graphviz(identifier).splitlines()
+            for identifier in self.objects
+        ]
+
+    def test_same_graphviz(self) -> None:
+        """Same graphviz, computed once"""
+        cache = SubGraphCache(self.graph)
+        expected = [
+            leading_to(self.graph, identifier) for identifier in self.objects
+        ]
+        self.assertEqual(self.graphviz(cache), expected)
+        self.assertEqual(self.graphviz(cache), expected)
+        stats = cache.stats()
+        self.assertEqual(stats['misses'], len(self.objects))
+        self.assertEqual(stats['hits'], len(self.objects))
+        self.assertEqual(stats['evictions'], 0)
+
+    def test_settings(self) -> None:
+        """Entries keyed on settings"""
+        cache = SubGraphCache(self.graph)
+        settings = (2, IgnoreMode.ALL_PARENTS, IgnoreMode.ALL_PARENTS,
+                    IgnoreMode.ALL_PARENTS)
+        identifier = self.objects[-1]
+        self.assertEqual(
+            cache.graphviz(identifier, settings).splitlines(),
+            leading_to(self.graph, identifier, settings))
+        self.assertEqual(
+            cache.graphviz(identifier).splitlines(),
+            leading_to(self.graph, identifier))
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_index(self) -> None:
+        """Missing subgraphs answered from the ancestor index"""
+        cache = SubGraphCache(self.graph, index=AncestorIndex(self.graph))
+        self.assertEqual(
+            self.graphviz(cache), [
+                leading_to(self.graph, identifier)
+                for identifier in self.objects
+            ])
+
+    def test_eviction(self) -> None:
+        """Least recently used entries dropped beyond the maximum size"""
+        sizes = SubGraphCache(self.graph)
+        self.graphviz(sizes)
+        max_size = sizes.stats()['size'] // 3
+        cache = SubGraphCache(self.graph, max_size)
+        self.graphviz(cache)
+        stats = cache.stats()
+        self.assertLessEqual(stats['size'], max_size)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertEqual(stats['entries'] + stats['evictions'],
+                         len(self.objects))
+        # The last queried object is kept
+        cache.graphviz(self.objects[-1])
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_modified_graph(self) -> None:
+        """Entries dropped when the graph changes"""
+        cache = SubGraphCache(self.graph)
+        self.graphviz(cache)
+        self.graph.version += 1
+        cache.graphviz(self.objects[0])
+        self.assertEqual(cache.stats()['entries'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""HTTP server answering graphs leading to objects"""
+
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import urlopen
+
+from mamaty import load_databank_graph
+from mamaty.server import GraphServer
+
+from databank_case import DatabankTestCase, leading_to
+
+
+class GraphServerTest(DatabankTestCase):
+    """Requests answered concurrently by a server on a free port"""
+
+    def setUp(self) -> None:
+        self.graph = load_databank_graph(self.root_folder)
+        self.server = GraphServer(('127.0.0.1', 0), self.graph, threads=4)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def get(self, path: str) -> bytes:
+        """Body of the answer to GET path"""
+        url = 'http://127.0.0.1:{}{}'.format(self.server.server_port, path)
+        with urlopen(url, timeout=30) as answer:
+            return answer.read()  # type: ignore
+
+    def get_json(self, path: str) -> Any:
+        """JSON answer to GET path"""
+        return json.loads(self.get(path).decode())
+
+    def test_graphs(self) -> None:
+        """Concurrent requests get the graphviz of SubGraph"""
+        objects = [
+            identifier for identifier in sorted(self.graph.obj_to_node)
+            if identifier not in self.graph.unreachable
+        ][::3]
+        paths = ['/graph/{}'.format(identifier) for identifier in objects] * 2
+        with ThreadPoolExecutor(8) as executor:
+            bodies = list(executor.map(self.get, paths))
+        for identifier, body in zip(objects * 2, bodies):
+            self.assertEqual(body.decode().splitlines(),
+                             leading_to(self.graph, identifier), identifier)
+        stats = self.get_json('/stats')
+        self.assertEqual(stats['entries'], len(objects))
+        self.assertEqual(stats['hits'] + stats['misses'], len(paths))
+
+    def test_names(self) -> None:
+        """Objects requested and searched by name"""
+        self.assertEqual(
+            self.get('/graph/' + quote('object 42')), self.get('/graph/42'))
+        self.assertEqual(
+            self.get_json('/search?q=' + quote('Object 42')),
+            [{
+                'id': 42,
+                'name': 'Object 42'
+            }])
+        self.assertEqual(self.get_json('/search?q='), [])
+        self.assertEqual(self.get_json('/search?q=%20'), [])
+        self.assertEqual(self.get_json('/search'), [])
+
+    def test_errors(self) -> None:
+        """Unknown objects and paths"""
+        for path in ('/graph/9999', '/graph/Obj', '/graph', '/other/42'):
+            with self.assertRaises(HTTPError) as error:
+                self.get(path)
+            self.assertEqual(error.exception.code, 404, path)
+            error.exception.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Graph shared by processes through a memory-mapped file"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from mamaty import CompactGraph, attach_graph, export_graph
+from mamaty import load_databank_graph, load_snapshot_graph
+
+from databank_case import DatabankTestCase
+
+
+class SharedGraphTest(DatabankTestCase):
+    """Attached graphs are the exported graph"""
+
+    def setUp(self) -> None:
+        self.graph = load_databank_graph(self.root_folder)
+        self.files = tempfile.mkdtemp()
+        self.shared_file = os.path.join(self.files, 'shared')
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.files)
+
+    def test_graph(self) -> None:
+        """Graph exported with its computed arrays"""
+        export_graph(self.graph, self.shared_file)
+        attached = attach_graph(self.shared_file)
+        self.assertEqual(
+            {name: list(values)
+             for name, values in attached.arrays().items()}, {
+                 name: list(values)
+                 for name, values in CompactGraph.from_graph(self.graph)
+                 .arrays().items()
+             })
+        self.assert_same_graph(attached, self.graph)
+
+    def test_compact_graph(self) -> None:
+        """Snapshot exported as is, and attached twice"""
+        snapshot = load_snapshot_graph(self.root_folder,
+                                       os.path.join(self.files, 'snapshot'))
+        export_graph(snapshot, self.shared_file)
+        for _ in range(2):
+            self.assert_same_graph(attach_graph(self.shared_file), self.graph)
+
+    def test_version(self) -> None:
+        """Files of another version refused"""
+        with mock.patch('mamaty.shared.SHARED_VERSION', -1):
+            export_graph(self.graph, self.shared_file)
+        with self.assertRaises(ValueError):
+            attach_graph(self.shared_file)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Snapshots of the computed graph"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mamaty import Profiler, load_databank_graph, load_snapshot_graph
+
+from databank_case import DatabankTestCase
+
+
+class SnapshotTest(DatabankTestCase):
+    """Snapshots give the normal graph"""
+
+    def setUp(self) -> None:
+        self.expected = load_databank_graph(self.root_folder)
+        self.files = tempfile.mkdtemp()
+        self.snapshot_file = os.path.join(self.files, 'snapshot')
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.files)
+
+    def test_snapshot(self) -> None:
+        """Computed, then read from the snapshot"""
+        for computed in (True, False):
+            profiler = Profiler()
+            graph = load_snapshot_graph(
+                self.root_folder, self.snapshot_file, profiler=profiler)
+            self.assertEqual('save snapshot' in [
+                phase.name for phase in profiler.phases
+            ], computed)
+            self.assert_same_graph(graph, self.expected)
+
+    def test_snapshot_cache(self) -> None:
+        """Snapshot of a databank read through the cache"""
+        for _ in range(2):
+            graph = load_snapshot_graph(
+                self.root_folder,
+                self.snapshot_file,
+                cache_file=os.path.join(self.files, 'cache'))
+            self.assert_same_graph(graph, self.expected)
+
+    def test_modified(self) -> None:
+        """Computed again when a data file changes"""
+        load_snapshot_graph(self.root_folder, self.snapshot_file)
+        path = 'objects/57.txt'
+        with open(self.data_file(path)) as in_file:
+            content = in_file.read()
+        try:
+            self.write(path, content.replace('Object 57', 'Modified 57'))
+            graph = load_snapshot_graph(self.root_folder, self.snapshot_file)
+            self.assertEqual(
+                graph.object_name(graph.obj_to_node[57]), 'Modified 57')
+        finally:
+            self.write(path, content)
+
+    def test_to_graph(self) -> None:
+        """Full graph expanded from a snapshot"""
+        graph = load_snapshot_graph(self.root_folder, self.snapshot_file)
+        self.assert_same_graph(graph.to_graph(), self.expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# Copyright 2018 Sacha Delanoue
+#
+# This file is part of MamaTY, a helper for the game 'One Hour One Life'.
+#
+# MamaTY is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MamaTY is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MamaTY.  If not, see <http://www.gnu.org/licenses/>.
+"""Incremental update of the databank and its graph"""
+
+import os
+import shutil
+import unittest
+
+from mamaty import Graph, load_databank, watch_databank_graph
+from mamaty.subgraph import IgnoreMode
+
+from databank_case import DatabankTestCase, leading_to, object_complexities
+
+# Keeping all parents, without distance limit: unlike the least complex
+# parent among equally complex ones, the subgraph does not depend on the
+# order of nodes, which differs between an updated and a rebuilt graph
+ALL_PARENTS = (0, IgnoreMode.ONLY_EXISTING_PARENTS, IgnoreMode.NO_PARENTS,
+               IgnoreMode.ALL_PARENTS)
+
+
+class UpdateTest(DatabankTestCase):
+    """Incremental update gives the graph of a full rebuild"""
+
+    def setUp(self) -> None:
+        self.watcher = watch_databank_graph(self.root_folder)
+        self.saved = os.path.join(self.tmp_folder, 'saved')
+        shutil.copytree(self.root_folder, self.saved)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root_folder)
+        shutil.copytree(self.saved, self.root_folder)
+        shutil.rmtree(self.saved)
+
+    def assert_up_to_date(self) -> None:
+        """Poll the folder, and compare with a graph built from scratch"""
+        self.watcher.poll()
+        graph = self.watcher.graph
+        assert graph is not None
+        expected = Graph(*load_databank(self.root_folder))
+        self.assertEqual(
+            object_complexities(graph), object_complexities(expected))
+        self.assertEqual(set(graph.unreachable), set(expected.unreachable))
+        self.assertEqual(graph.edge_count(), expected.edge_count())
+        self.assertEqual(len(graph.looping_edges), len(expected.looping_edges))
+        for identifier in sorted(expected.obj_to_node):
+            if identifier not in expected.unreachable:
+                self.assertEqual(
+                    sorted(leading_to(graph, identifier, ALL_PARENTS)),
+                    sorted(leading_to(expected, identifier, ALL_PARENTS)),
+                    identifier)
+
+    def test_natural(self) -> None:
+        """Objects found in nature, or no longer"""
+        for identifier in (3, 57, 120):
+            path = 'objects/{}.txt'.format(identifier)
+            with open(self.data_file(path)) as in_file:
+                lines = in_file.read().splitlines()
+            natural = [
+                line for line in lines if line.startswith('mapChance=')
+            ][0]
+            chance = '0.000' if natural != 'mapChance=0.000#biomes_0' \
+                else '0.5'
+            self.write(path, '\n'.join('mapChance={}#biomes_0'.format(chance)
+                                       if line == natural else line
+                                       for line in lines) + '\n')
+            self.assert_up_to_date()
+
+    def test_transitions(self) -> None:
+        """Transitions removed, modified and added"""
+        transitions = sorted(
+            name for name in os.listdir(self.data_file('transitions'))
+            if not name.startswith('-1'))
+        os.remove(self.data_file('transitions/' + transitions[0]))
+        self.assert_up_to_date()
+        self.write('transitions/' + transitions[1],
+                   '150 160 0 0.0 0.0 0 0 0 0\n')
+        self.assert_up_to_date()
+        # Making a cycle
+        self.write('transitions/180_0.txt', '5 0 0 0.0 0.0 0 0 0 0\n')
+        self.assert_up_to_date()
+
+    def test_new_object(self) -> None:
+        """New object, made by a new transition"""
+        self.write('objects/201.txt', 'id=201\nNew 201\ncontainable=0\n'
+                   'mapChance=0.000#biomes_0\n')
+        self.write('objects/nextObjectNumber.txt', '202')
+        self.write('transitions/0_42.txt', '201 0 0 0.0 0.0 0 0 0 0\n')
+        self.assert_up_to_date()
+
+    def test_category(self) -> None:
+        """Category with other objects"""
+        category = sorted(os.listdir(self.data_file('categories')))[0]
+        self.write('categories/' + category,
+                   'parentID={}\nnumObjects=2\n12\n34\n'.format(category[:-4]))
+        self.assert_up_to_date()
+
+    def test_half_written_object(self) -> None:
+        """Old object kept until its file parses"""
+        self.write('objects/57.txt', 'id=57\nHalf\nmapChance=')
+        self.watcher.poll()
+        self.assertEqual(self.watcher.objects[57].name,
+                         load_databank(self.saved)[0][57].name)
+
+
+if __name__ == '__main__':
+    unittest.main()